@@ -0,0 +1,493 @@
+"""
+CSC111 Project 2: Wrap Mapped, Unpacked
+Authors: Colleen Chang, Richard Li, Roy Liu, Mina (Chieh-Yi) Wu
+
+File Description
+=============================================================================
+This file contains an array-backed storage engine that answers the same queries as storage.Tree.
+
+Regions, songs and artists are given integer ids. The cities of each country and the countries of
+each continent are stored as CSR offset arrays, and every song placement (a song charting in a city) is
+stored as a row of fixed-width NumPy columns ordered by city. Since cities are ordered by country and
+countries by continent, the placements of any region form one contiguous slice, so queries are vectorized
+NumPy calls over a slice instead of Python recursion over Tree objects.
+
+The columns can be saved to a directory of .npy files, with the region, song and artist names in a JSON
+string dictionary, and opened again as memory-mapped arrays, so that very large chart exports can be queried
+without loading every placement into memory.
+"""
+from __future__ import annotations
+import json
+import os
+from typing import Any
+
+import numpy as np
+
+from storage import Tree, Song
+
+LEVELS = ('continent', 'country', 'city')
+
+# the placement columns, in the order they are stored, with their fixed-width types
+COLUMNS = {'continent': np.int32, 'country': np.int32, 'city': np.int32, 'song': np.int32,
+           'artist': np.int32, 'rank': np.int8, 'streams': np.int64}
+
+
+class ArrayTree:
+    """An array-backed, read-only copy of a World tree exposing the query methods of storage.Tree.
+
+    Methods that storage.Tree calls on a region subtree (get_songs, get_comparison_score, ...) take the region
+    as an extra argument instead, in any form accepted by top_n: a continent, country or city name, a
+    (city, country) tuple, or 'World'.
+
+    Representation Invariants:
+        - len(self._names) == len(self._parents) == len(self._bounds) == 3
+        - all(len(self._bounds[level]) == len(self._names[level]) + 1 for level in range(3))
+        - all(len(self._columns[column]) == self._bounds[0][-1] for column in COLUMNS)
+
+    >>> tree = Tree('World', [])
+    >>> tree.insert_sequence(['Asia', 'Japan', 'Tokyo', Song('idol', 'yoasobi', 100)], 1)
+    >>> tree.insert_sequence(['Asia', 'Japan', 'Tokyo', Song('bling-bang-bang-born', 'creepy nuts', 90)], 2)
+    >>> tree.insert_sequence(['Asia', 'Japan', 'Osaka', Song('bling-bang-bang-born', 'creepy nuts', 90)], 1)
+    >>> tree.insert_sequence(['Europe', 'France', 'Paris', Song('idol', 'yoasobi', 100)], 1)
+    >>> arrays = ArrayTree.from_tree(tree)
+    >>> arrays.top_n(5, 'Japan') == tree.top_n(5, 'Japan')
+    True
+    >>> arrays.get_region_streams('city') == tree.get_region_streams('city')
+    True
+    >>> songs = ['bling-bang-bang-born', 'idol']
+    >>> tokyo = tree.find_regions('Tokyo')[0]
+    >>> arrays.get_comparison_score(songs, True, 'Tokyo') == tokyo.get_comparison_score(songs, True)
+    True
+    >>> arrays.region_personality(3, songs, 'city', True) == tree.region_personality(3, songs, 'city', True)
+    True
+    >>> arrays.common_song('Japan', 'France') == tree.common_song('Japan', 'France')
+    True
+    """
+    # Private Instance Attributes:
+    #   - _root:
+    #       The name of the root region, usually 'World'.
+    #   - _names:
+    #       _names[level][i] is the name of region i at the given level (0: continent, 1: country, 2: city).
+    #   - _parents:
+    #       _parents[level][i] is the id of the parent of region i at the given level, one level up.
+    #       Continents have the parent -1.
+    #   - _children:
+    #       CSR offsets: the children of region i at level 0 or 1 are the regions with ids in
+    #       range(_children[level][i], _children[level][i + 1]) one level down.
+    #   - _bounds:
+    #       The song placements of region i at a given level are the placements with indices in
+    #       range(_bounds[level][i], _bounds[level][i + 1]).
+    #   - _lookup:
+    #       A mapping from each region name, and each (name, parent name) pair, to the (level, id) pairs of the
+    #       regions with that name, in the order a pre-order traversal of the equivalent Tree reaches them.
+    #   - _titles, _artists:
+    #       The string dictionaries of song titles and artist names, indexed by id.
+    #   - _title_ids:
+    #       A mapping from each song title to its id in self._titles.
+    #   - _columns:
+    #       A mapping from each name in COLUMNS to that column of the song placements: the ids of the
+    #       placement's continent, country, city, song title and artist, the song's rank in the city,
+    #       and the song's number of streams. The columns may be memory-mapped.
+    _root: str
+    _names: list[list[str]]
+    _parents: list[np.ndarray]
+    _children: list[np.ndarray]
+    _bounds: list[np.ndarray]
+    _lookup: dict[Any, list[tuple[int, int]]]
+    _titles: list[str]
+    _artists: list[str]
+    _title_ids: dict[str, int]
+    _columns: dict[str, np.ndarray]
+
+    def __init__(self, names: list[list[str]], parents: list[list[int]], strings: tuple[list[str], list[str]],
+                 columns: dict[str, np.ndarray]) -> None:
+        """Initialize a new ArrayTree from its region names and parents, its (titles, artists) string
+        dictionaries, and its placement columns.
+
+        Use ArrayTree.from_tree or ArrayTree.open to create one from a Tree or from saved columns.
+
+        Preconditions:
+            - len(names) == len(parents) == 3
+            - set(columns) == set(COLUMNS)
+            - columns['city'] is sorted, and the cities of each country and the countries of each continent
+              have consecutive ids
+        """
+        self._root = 'World'
+        self._names = names
+        self._parents = [np.array(level_parents, dtype=np.int64) for level_parents in parents]
+        self._titles, self._artists = strings
+        self._title_ids = {self._titles[i]: i for i in range(len(self._titles))}
+        self._columns = columns
+
+        city_bounds = np.searchsorted(columns['city'], np.arange(len(names[2]) + 1))
+        self._build_offsets(city_bounds.astype(np.int64))
+        self._build_lookup()
+
+    @classmethod
+    def from_tree(cls, tree: Tree) -> ArrayTree:
+        """Returns a new ArrayTree holding the same regions and songs as the given tree.
+
+        Preconditions:
+            - tree is a World tree whose leaves are all ranked Songs at the city level
+        """
+        names = [[], [], []]
+        parents = [[], [], []]
+        region_ids = {}
+        title_ids, artist_ids = {}, {}
+        columns = {column: [] for column in COLUMNS}
+
+        for city, sequence in tree.iter_regions('city'):
+            # register the continent, country and city of this sequence the first time they are seen
+            ids = []
+            for level in range(3):
+                path = tuple(sequence[:level + 1])
+                if path not in region_ids:
+                    region_ids[path] = len(names[level])
+                    names[level].append(sequence[level])
+                    parents[level].append(region_ids[path[:-1]] if level > 0 else -1)
+                ids.append(region_ids[path])
+
+            for song, rank in city.iter_ranked_songs():
+                for level in range(3):
+                    columns[LEVELS[level]].append(ids[level])
+                columns['song'].append(title_ids.setdefault(song.title, len(title_ids)))
+                columns['artist'].append(artist_ids.setdefault(song.artist, len(artist_ids)))
+                columns['rank'].append(rank)
+                columns['streams'].append(song.streams)
+
+        return cls(names, parents, (list(title_ids), list(artist_ids)),
+                   {column: np.array(columns[column], dtype=COLUMNS[column]) for column in COLUMNS})
+
+    def save(self, directory: str) -> None:
+        """Saves this tree to the given directory, as one .npy file per placement column and a JSON file of the
+        region names and parents and the title and artist string dictionaries.
+
+        >>> import tempfile
+        >>> tree = Tree('World', [])
+        >>> tree.insert_sequence(['Asia', 'Japan', 'Tokyo', Song('idol', 'yoasobi', 100)], 1)
+        >>> tree.insert_sequence(['Europe', 'France', 'Paris', Song('flowers', 'miley cyrus', 80)], 1)
+        >>> arrays = ArrayTree.from_tree(tree)
+        >>> with tempfile.TemporaryDirectory() as directory:
+        ...     arrays.save(directory)
+        ...     opened = ArrayTree.open(directory)
+        ...     opened.get_region_top_songs('country') == arrays.get_region_top_songs('country')
+        True
+        """
+        os.makedirs(directory, exist_ok=True)
+        for column in COLUMNS:
+            np.save(os.path.join(directory, column + '.npy'), np.asarray(self._columns[column], dtype=COLUMNS[column]))
+
+        dictionaries = {'names': self._names, 'parents': [level.tolist() for level in self._parents],
+                        'titles': self._titles, 'artists': self._artists}
+        with open(os.path.join(directory, 'dictionaries.json'), 'w', encoding='utf8') as file:
+            json.dump(dictionaries, file, ensure_ascii=False)
+
+    @classmethod
+    def open(cls, directory: str) -> ArrayTree:
+        """Returns the ArrayTree saved in the given directory by ArrayTree.save.
+
+        The placement columns are memory-mapped rather than read, so only the pages touched by a query are
+        loaded, and only the region names and string dictionaries are held in memory.
+        """
+        with open(os.path.join(directory, 'dictionaries.json'), encoding='utf8') as file:
+            dictionaries = json.load(file)
+        columns = {column: np.load(os.path.join(directory, column + '.npy'), mmap_mode='r') for column in COLUMNS}
+        return cls(dictionaries['names'], dictionaries['parents'],
+                   (dictionaries['titles'], dictionaries['artists']), columns)
+
+    def _build_offsets(self, city_bounds: np.ndarray) -> None:
+        """Builds the CSR child offsets of continents and countries and the placement bounds of every level
+        from the placement bounds of the cities.
+        """
+        self._children = []
+        for level in range(2):
+            counts = np.bincount(self._parents[level + 1], minlength=len(self._names[level]))
+            self._children.append(np.concatenate(([0], np.cumsum(counts))))
+
+        country_bounds = city_bounds[self._children[1]]
+        self._bounds = [country_bounds[self._children[0]], country_bounds, city_bounds]
+
+    def _build_lookup(self) -> None:
+        """Builds the index from region names and (name, parent name) pairs to region ids.
+        """
+        self._lookup = {}
+        for level in range(3):
+            for i in range(len(self._names[level])):
+                self._lookup.setdefault(self._names[level][i], []).append((level, i))
+                parent = self._names[level - 1][self._parents[level][i]] if level > 0 else self._root
+                self._lookup.setdefault((self._names[level][i], parent), []).append((level, i))
+
+        # ids are consecutive in tree order at every level, so comparing the ids on the paths down to two regions
+        # orders them in pre-order
+        for regions in self._lookup.values():
+            regions.sort(key=self._path_ids)
+
+    def _path_ids(self, region: tuple[int, int]) -> list[int]:
+        """Returns the ids of the regions on the path from a continent down to the given (level, id) region.
+        """
+        level, i = region
+        ids = []
+        while level >= 0:
+            ids.append(int(i))
+            i = int(self._parents[level][i])
+            level -= 1
+        return ids[::-1]
+
+    def _find_slices(self, target: Any) -> list[tuple[int, int]]:
+        """Returns the placement slice (start, end) of every region whose name is target, in the order a
+        pre-order depth-first search of the equivalent Tree would reach them, as Tree.find_regions does.
+        """
+        if target == self._root:
+            return [(0, int(self._bounds[0][-1]))]
+        return [(int(self._bounds[level][i]), int(self._bounds[level][i + 1]))
+                for level, i in self._lookup.get(target, [])]
+
+    def _region_slice(self, region: Any) -> tuple[int, int]:
+        """Returns the placement slice of the first region whose name is region, or an empty slice if there is
+        no such region.
+        """
+        slices = self._find_slices(region)
+        return slices[0] if slices else (0, 0)
+
+    def _sequence(self, level: int, i: int) -> list[str]:
+        """Returns the list of the sequence from a continent to region i at the given level.
+        """
+        sequence = []
+        while level >= 0:
+            sequence.append(self._names[level][i])
+            i = int(self._parents[level][i])
+            level -= 1
+        return sequence[::-1]
+
+    def _level_keys(self, level: int) -> list:
+        """Returns the dictionary keys used for the regions of the given level by get_region_streams,
+        get_region_scores and get_region_top_songs: names, or (city, country) pairs for cities.
+        """
+        if level < 2:
+            return list(self._names[level])
+        return [(self._names[2][i], self._names[1][self._parents[2][i]]) for i in range(len(self._names[2]))]
+
+    def _top_in_slice(self, n: int, start: int, end: int) -> list[tuple]:
+        """Returns the name, artist and streams of the top n songs among the placements in the given slice.
+
+        Songs are ranked by number of appearances, with ties in the order the titles first appear, which is
+        the order used by Tree.top_n. The artist and streams come from the last appearance of each title.
+        """
+        titles = np.asarray(self._columns['song'][start:end])
+        if len(titles) == 0:
+            return []
+
+        unique_titles, first, inverse = np.unique(titles, return_index=True, return_inverse=True)
+        counts = np.bincount(inverse)
+        last = len(titles) - 1 - np.unique(titles[::-1], return_index=True)[1]
+
+        # a single key ordering by count, then by earliest first appearance
+        key = counts.astype(np.int64) * len(titles) - first
+        k = min(n, len(unique_titles))
+        top = np.argpartition(-key, k - 1)[:k]
+        top = top[np.argsort(-key[top])]
+
+        return [(self._titles[unique_titles[i]], self._artists[self._columns['artist'][start + last[i]]],
+                 int(self._columns['streams'][start + last[i]])) for i in top]
+
+    def _score_totals(self, songs: list[str], ranked: bool, start: int, end: int) -> np.ndarray:
+        """Returns the comparison score contribution to the given songs of every placement in the given slice, in
+        fifths, so that region totals can be summed exactly as integers.
+        """
+        titles = self._columns['song'][start:end]
+        points = np.zeros(end - start, dtype=np.int64)
+        for i in range(len(songs)):
+            if songs[i] in self._title_ids:
+                matches = titles == self._title_ids[songs[i]]
+                if ranked:
+                    ranks = np.asarray(self._columns['rank'][start:end][matches], dtype=np.int64)
+                    points[matches] = 5 - np.abs(i + 1 - ranks)
+                else:
+                    points[matches] = 5
+        return points
+
+    def _level_scores(self, songs: list[str], level: int, ranked: bool) -> list[float]:
+        """Returns the comparison score of every region at the given level to the given songs.
+        """
+        bounds = self._bounds[level]
+        prefix = np.concatenate(([0], np.cumsum(self._score_totals(songs, ranked, 0, int(bounds[-1])))))
+        totals = prefix[bounds[1:]] - prefix[bounds[:-1]]
+        sizes = bounds[1:] - bounds[:-1]
+        return [round(int(totals[i]) / (5 * int(sizes[i])), 5) if sizes[i] > 0 else 0.0
+                for i in range(len(sizes))]
+
+    def top_n(self, n: int, target: str | tuple[str, str]) -> list[tuple]:
+        """Returns a list of tuple with the top n songs, their artists, and stream in the region named target,
+        or [] if the target is not found. Equivalent to Tree.top_n.
+
+        Representation Invariants:
+            - n >= 1
+        """
+        for start, end in self._find_slices(target):
+            top = self._top_in_slice(n, start, end)
+            if top != []:
+                return top
+        return []
+
+    def get_songs(self, region: Any = 'World') -> set[Song]:
+        """Returns a set of all songs found in the given region.
+        """
+        start, end = self._region_slice(region)
+        records = np.stack([np.asarray(self._columns[column][start:end], dtype=np.int64)
+                            for column in ('song', 'artist', 'streams')], axis=1)
+        return {Song(self._titles[title], self._artists[artist], int(streams))
+                for title, artist, streams in np.unique(records, axis=0)}
+
+    def get_all_song_titles(self, region: Any = 'World') -> set[str]:
+        """Returns all of the song titles in the given region.
+        """
+        start, end = self._region_slice(region)
+        return {self._titles[title] for title in np.unique(self._columns['song'][start:end])}
+
+    def get_comparison_score(self, songs: list[str], ranked: bool = False, region: Any = 'World') -> float:
+        """Computes a comparison score of the given region to the provided songs list, as specified by
+        Tree.get_comparison_score.
+
+        Preconditions:
+            - 1 <= len(songs) <= 5
+        """
+        start, end = self._region_slice(region)
+        if start == end:
+            return 0.0
+        total = int(self._score_totals(songs, ranked, start, end).sum())
+        return round(total / (5 * (end - start)), 5)
+
+    def region_personality(self, n: int, songs: list[str],
+                           region_range: str, ranked: bool = False) -> list[tuple[float, list[str]]]:
+        """Returns a list with n tuples containing regions who have the highest similarity score to the given songs,
+        as specified by Tree.region_personality.
+
+        Preconditions:
+            - n >= 1
+            - region_range in {'continent', 'country', 'city'}
+            - 1 <= len(songs) <= 5
+        """
+        level = LEVELS.index(region_range)
+        level_scores = self._level_scores(songs, level, ranked)
+        scores = [(level_scores[i], self._sequence(level, i)) for i in range(len(level_scores))
+                  if level < 2 or self._names[2][i] != '0']
+        scores.sort(reverse=True)
+        return scores[:min(len(scores), n)]
+
+    def recommend_songs(self, lim: tuple[int, int], songs: list[str],
+                        region_range: str, ranked: bool = False) -> list[Song]:
+        """Returns a max of lim[0] new song recommendations from the top lim[1] regions with the highest
+        similarity score with the songs list.
+
+        Preconditions:
+            - 1 <= len(songs) <= 5
+        """
+        recommendations = []
+        recommended_songs = set()
+        for score in self.region_personality(lim[1], songs, region_range, ranked):
+            sequence = score[1]
+            region = (sequence[-1], sequence[-2]) if len(sequence) > 1 else sequence[0]
+            for r_song in self.get_songs(region):
+                if r_song.title not in songs and r_song.title not in recommended_songs:
+                    recommendations.append(r_song)
+                    recommended_songs.add(r_song.title)
+
+        return recommendations[:min(lim[0], len(recommendations))]
+
+    def get_region_streams(self, kind: str) -> dict[str, int] | dict[tuple, int]:
+        """Returns dictionary mapping parts of a region with the total number of streams from their top 5 songs.
+
+        Preconditions:
+            - kind in {"continent", "country", "city"}
+        """
+        return {key: sum(song[2] for song in self.top_n(5, key)) for key in self._level_keys(LEVELS.index(kind))}
+
+    def get_region_scores(self, songs: list[str], kind: str, ranked: bool = False) \
+            -> dict[str, float] | dict[tuple, float]:
+        """Returns dictionary mapping parts of a region with their comparison/similarity score based on the list of
+        songs given.
+
+        Preconditions:
+            - kind in {"continent", "country", "city"}
+            - 1 <= len(songs) <= 5
+        """
+        level = LEVELS.index(kind)
+        return dict(zip(self._level_keys(level), self._level_scores(songs, level, ranked)))
+
+    def get_region_top_songs(self, kind: str) -> dict[str, list[str]] | dict[tuple, list[str]]:
+        """Returns dictionary mapping parts of a region with lists of their top 5 songs in descending order of
+        number of streams.
+
+        Preconditions:
+            - kind in {"continent", "country", "city"}
+        """
+        return {key: [song[0] for song in self.top_n(5, key)] for key in self._level_keys(LEVELS.index(kind))}
+
+    def common_song_artist_helper(self, country: str, c_type: str) -> list[str]:
+        """Returns the top 5 artists/songs in a particular country
+
+        Representation Invariants:
+            - c_type in {'artist', 'song'}
+        """
+        column = 1 if c_type == 'artist' else 0
+        return [song[column] for song in self.top_n(5, country)]
+
+    def common_artist(self, country1: str, country2: str) -> list[str]:
+        """Returns a list of the most commonly occurring artists between the top songs of two countries
+        in descending order, as specified by Tree.common_artist.
+        """
+        return self._common(country1, country2, 1)
+
+    def common_song(self, country1: str, country2: str) -> list[str]:
+        """Returns a list of the most commonly occurring songs between the top songs of two countries
+        in descending order, as specified by Tree.common_song.
+        """
+        return self._common(country1, country2, 0)
+
+    def _common(self, country1: str, country2: str, column: int) -> list[str]:
+        """Returns the items in the given column of the top songs of both countries, ordered by the number of
+        times they appear in country1's top songs, for items appearing at most as often in country1.
+        """
+        counts1, counts2 = {}, {}
+        for song in self.top_n(100, country1):
+            counts1[song[column]] = counts1.get(song[column], 0) + 1
+        for song in self.top_n(100, country2):
+            counts2[song[column]] = counts2.get(song[column], 0) + 1
+
+        common = {item: counts1[item] for item in counts1 if item in counts2 and counts1[item] <= counts2[item]}
+        return sorted(common, key=common.get, reverse=True)
+
+    def most_common_artist_country(self, country1: str) -> str:
+        """Returns the country whose top artists have the most in common with those of country1.
+        """
+        return self._most_common_country(country1, 'artist')
+
+    def most_common_song_country(self, country1: str) -> str:
+        """Returns the country whose top songs have the most in common with those of country1.
+        """
+        return self._most_common_country(country1, 'song')
+
+    def _most_common_country(self, country1: str, c_type: str) -> str:
+        """Returns the country with the most top artists/songs in country1's top 5 artists/songs.
+
+        Raises IndexError if no other country shares any, like Tree.most_common_artist_country.
+        """
+        country_top = self.common_song_artist_helper(country1, c_type)
+        most_similar = {}
+        for country in self._names[1]:
+            if country != country1:
+                shared = sum(1 for item in self.common_song_artist_helper(country, c_type) if item in country_top)
+                if shared > 0:
+                    most_similar[country] = shared
+
+        return sorted(most_similar, key=most_similar.get, reverse=True)[0]
+
+
+if __name__ == "__main__":
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['json', 'os', 'numpy', 'storage'],
+        'forbidden-io-functions': [],  # allows for open, to save and open the string dictionaries
+        'max-line-length': 120
+    })
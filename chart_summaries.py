@@ -0,0 +1,393 @@
+"""
+CSC111 Project 2: Wrap Mapped, Unpacked
+Authors: Colleen Chang, Richard Li, Roy Liu, Mina (Chieh-Yi) Wu
+
+File Description
+=============================================================================
+This file contains the classes that summarize charts without keeping their Trees: bounded-memory summaries
+of a streamed chart file, and the history of weekly charts answering queries over windows of weeks.
+
+"""
+from __future__ import annotations
+import bisect
+import heapq
+from typing import Any, Optional
+
+from region_aggregates import RegionAggregate
+from storage import Song, Tree
+
+
+class RegionSummary:
+    """Running aggregates of the songs charting in one region, kept in bounded memory.
+
+    The number of appearances of each song title is tracked with the Space-Saving algorithm: at most
+    max_candidates titles are counted at once, and a new title replaces the one with the smallest count, taking
+    over its count. Every title appearing in more than num_songs / max_candidates placements is guaranteed to be
+    kept, and a region with at most max_candidates distinct titles is counted exactly. The counted titles are
+    grouped by count (the stream-summary structure), so finding the title to replace takes constant time.
+
+    Instance Attributes:
+      - num_songs: the number of song placements (a song charting in a city) seen in this region
+      - total_streams: the sum of the streams of every song placement seen in this region
+      - max_candidates: the maximum number of song titles counted at once
+
+    Representation Invariants:
+        - self.max_candidates >= 1
+        - len(self._candidates) <= self.max_candidates
+    """
+    # Private Instance Attributes:
+    #   - _candidates:
+    #       A mapping from each counted title to a list of its (estimated) number of appearances and the last Song
+    #       seen with that title, in the order the titles started being counted.
+    #   - _buckets:
+    #       A mapping from each count to the titles counted that many times, in the order they reached that count.
+    #       The titles are the keys of a dict, which is used as an ordered set.
+    #   - _min_count:
+    #       The smallest count in _buckets, or 0 if no title is counted yet.
+    num_songs: int
+    total_streams: int
+    max_candidates: int
+    _candidates: dict[str, list]
+    _buckets: dict[int, dict[str, None]]
+    _min_count: int
+
+    def __init__(self, max_candidates: int) -> None:
+        """Initialize an empty summary counting at most max_candidates song titles.
+        """
+        self.num_songs = 0
+        self.total_streams = 0
+        self.max_candidates = max_candidates
+        self._candidates = {}
+        self._buckets = {}
+        self._min_count = 0
+
+    def add(self, song: Song) -> None:
+        """Records one placement of the given song in this region.
+        """
+        self.num_songs += 1
+        self.total_streams += song.streams
+        if song.title in self._candidates:
+            count = self._candidates[song.title][0]
+            self._candidates[song.title] = [count + 1, song]
+            self._move_up(song.title, count)
+        elif len(self._candidates) < self.max_candidates:
+            self._candidates[song.title] = [1, song]
+            self._buckets.setdefault(1, {})[song.title] = None
+            self._min_count = 1
+        else:
+            count = self._min_count
+            evicted = next(iter(self._buckets[count]))
+            del self._candidates[evicted]
+            self._candidates[song.title] = [count + 1, song]
+            del self._buckets[count][evicted]
+            self._buckets[count][song.title] = None
+            self._move_up(song.title, count)
+
+    def _move_up(self, title: str, count: int) -> None:
+        """Moves the given title from the bucket of titles counted count times to the next one.
+
+        Preconditions:
+            - title in self._buckets[count]
+        """
+        del self._buckets[count][title]
+        self._buckets.setdefault(count + 1, {})[title] = None
+        if not self._buckets[count]:
+            del self._buckets[count]
+            if count == self._min_count:
+                self._min_count = count + 1
+
+    def top_n(self, n: int) -> list[tuple]:
+        """Returns a list of tuple with the top n songs of this region, their artists, and streams, in the format
+        of Tree.top_n.
+
+        >>> summary = RegionSummary(2)
+        >>> for song in [Song('a', 'x', 1), Song('b', 'y', 2), Song('b', 'y', 2), Song('c', 'z', 3)]:
+        ...     summary.add(song)
+        >>> summary.top_n(5)
+        [('b', 'y', 2), ('c', 'z', 3)]
+        >>> (summary.num_songs, summary.total_streams)
+        (4, 8)
+        """
+        top_titles = heapq.nlargest(n, self._candidates, key=lambda title: self._candidates[title][0])
+        return [(title, self._candidates[title][1].artist, self._candidates[title][1].streams)
+                for title in top_titles]
+
+
+def find_region_key(regions: dict[Any, Any], target: str | tuple[str, str]) -> Optional[Any]:
+    """Returns the key of the region named target in regions, a mapping keyed like the results of
+    Tree.get_region_streams, or None if there is no such region.
+
+    A bare city name is resolved to the first (city, country) key with that city, as Tree.top_n finds the first
+    city with a name.
+
+    >>> find_region_key({('Paris', 'France'): 1, ('Paris', 'United States'): 2}, 'Paris')
+    ('Paris', 'France')
+    >>> find_region_key({'Japan': 1}, 'Japan')
+    'Japan'
+    >>> find_region_key({'Japan': 1}, 'Tokyo') is None
+    True
+    """
+    if target in regions:
+        return target
+    if isinstance(target, str):
+        for key in regions:
+            if isinstance(key, tuple) and key[0] == target:
+                return key
+    return None
+
+
+class ChartSummary:
+    """Bounded-memory aggregates of every region of a chart, built by streaming its rows instead of building a Tree.
+
+    Regions are keyed like the results of Tree.get_region_streams: continents and countries by name, cities by
+    (city, country), and the whole chart by 'World'. Songs are seen in file order rather than tree order, so ties
+    between equally common songs, and the streams reported for each title, may differ from Tree.top_n for regions
+    whose rows are not contiguous in the file.
+
+    Instance Attributes:
+      - regions: a mapping from the kind of region ('World', 'continent', 'country' or 'city') to a mapping from
+        each region key to its RegionSummary
+      - max_candidates: the maximum number of song titles counted at once in each region
+    """
+    regions: dict[str, dict[Any, RegionSummary]]
+    max_candidates: int
+
+    def __init__(self, max_candidates: int) -> None:
+        """Initialize an empty chart summary counting at most max_candidates song titles per region.
+        """
+        self.max_candidates = max_candidates
+        self.regions = {'World': {}, 'continent': {}, 'country': {}, 'city': {}}
+
+    def add(self, sequence: list[str], songs: list[Song]) -> None:
+        """Records the given songs as charting in the region at the end of the given sequence from a continent to a
+        city, and in every region containing it.
+        """
+        keys = [('World', 'World'), ('continent', sequence[0]), ('country', sequence[1]),
+                ('city', (sequence[2], sequence[1]))]
+        for kind, key in keys:
+            if key not in self.regions[kind]:
+                self.regions[kind][key] = RegionSummary(self.max_candidates)
+            for song in songs:
+                self.regions[kind][key].add(song)
+
+    def top_n(self, n: int, target: str | tuple[str, str]) -> list[tuple]:
+        """Returns the top n songs of the region named target in the format of Tree.top_n, or [] if the target is
+        not found. A city may be named by itself, like in Tree.top_n, or by its (city, country) key.
+        """
+        for kind in ('World', 'continent', 'country', 'city'):
+            key = find_region_key(self.regions[kind], target)
+            if key is not None:
+                return self.regions[kind][key].top_n(n)
+        return []
+
+    def get_region_streams(self, kind: str) -> dict[str, int] | dict[tuple, int]:
+        """Returns dictionary mapping parts of a region with the total number of streams from their top 5 songs,
+        like Tree.get_region_streams.
+
+        Preconditions:
+            - kind in {"continent", "country", "city"}
+        """
+        return {key: sum(song[2] for song in summary.top_n(5)) for key, summary in self.regions[kind].items()}
+
+    def get_region_top_songs(self, kind: str) -> dict[str, list[str]] | dict[tuple, list[str]]:
+        """Returns dictionary mapping parts of a region with lists of their top 5 songs, like
+        Tree.get_region_top_songs.
+
+        Preconditions:
+            - kind in {"continent", "country", "city"}
+        """
+        return {key: [song[0] for song in summary.top_n(5)] for key, summary in self.regions[kind].items()}
+
+
+class ChartHistory:
+    """A time series of weekly World trees, answering queries over any window of weeks.
+
+    Each appended week is summarized once into a RegionAggregate for every region charting that week, so a
+    query over a window merges the partial aggregates of the weeks in the window instead of rescanning their
+    trees. The max_windows most recently used merged windows are cached. Since weeks are only ever appended, a
+    cached window never goes stale, and a cached window ending at the last week is extended by each new week
+    rather than merged again.
+
+    Regions are keyed like the results of Tree.get_region_streams: continents and countries by name, cities by
+    (city, country), and the whole chart by 'World'. Windows are given as inclusive start and end week labels,
+    where None leaves that side of the window open.
+
+    Instance Attributes:
+      - weeks: the labels of the appended weeks, in chronological order
+      - max_windows: the maximum number of merged windows kept in the cache
+
+    Representation Invariants:
+        - self.weeks == sorted(self.weeks)
+        - len(self.weeks) == len(self._trees) == len(self._aggregates)
+        - self.max_windows >= 1
+        - len(self._windows) <= self.max_windows
+
+    >>> history = ChartHistory()
+    >>> week1 = Tree('World', [])
+    >>> week1.insert_sequence(['Asia', 'Japan', 'Tokyo', Song('idol', 'yoasobi', 100)], 1)
+    >>> week2 = Tree('World', [])
+    >>> week2.insert_sequence(['Asia', 'Japan', 'Tokyo', Song('bling-bang-bang-born', 'creepy nuts', 90)], 1)
+    >>> history.append_week('2024-01-01', week1)
+    >>> history.append_week('2024-01-08', week2)
+    >>> history.top_n(5, 'Japan', start='2024-01-08')
+    [('bling-bang-bang-born', 'creepy nuts', 90)]
+    >>> history.get_region_streams('country')
+    {'Japan': 190}
+    """
+    # Private Instance Attributes:
+    #   - _trees:
+    #       The World tree of each week, in the order of self.weeks.
+    #   - _aggregates:
+    #       For each week, in the order of self.weeks, a mapping from the kind of region ('World', 'continent',
+    #       'country' or 'city') to a mapping from each region key charting that week to its RegionAggregate.
+    #   - _sequences:
+    #       A mapping from each kind of region to a mapping from each region key to its sequence from a continent
+    #       to the region, for every region that has charted in any week.
+    #   - _windows:
+    #       A cache mapping (first week index, last week index + 1, kind) to the merged aggregates of that window,
+    #       from the least to the most recently used.
+    weeks: list[str]
+    max_windows: int
+    _trees: list[Tree]
+    _aggregates: list[dict[str, dict[Any, RegionAggregate]]]
+    _sequences: dict[str, dict[Any, list[str]]]
+    _windows: dict[tuple[int, int, str], dict[Any, RegionAggregate]]
+
+    def __init__(self, max_windows: int = 32) -> None:
+        """Initialize an empty chart history caching at most max_windows merged windows.
+        """
+        self.weeks = []
+        self.max_windows = max_windows
+        self._trees = []
+        self._aggregates = []
+        self._sequences = {'World': {'World': []}, 'continent': {}, 'country': {}, 'city': {}}
+        self._windows = {}
+
+    def append_week(self, week: str, tree: Tree) -> None:
+        """Adds the given World tree as the chart of the given week.
+
+        Only the regions charting this week are summarized, in one pass over the tree, and no other week's
+        aggregates are touched. Cached windows ending at the previous last week are extended to end at this week
+        by merging in this week's aggregates alone.
+
+        Preconditions:
+            - tree._root == 'World'
+            - self.weeks == [] or week > self.weeks[-1]
+        """
+        aggregates = {'World': {'World': RegionAggregate()}, 'continent': {}, 'country': {}, 'city': {}}
+        for city, sequence in tree.iter_regions('city'):
+            keys = [('World', 'World'), ('continent', sequence[0]), ('country', sequence[1]),
+                    ('city', (sequence[2], sequence[1]))]
+            for depth in range(1, 4):
+                kind, key = keys[depth]
+                if key not in aggregates[kind]:
+                    aggregates[kind][key] = RegionAggregate()
+                    self._sequences[kind].setdefault(key, sequence[:depth])
+
+            for song, rank in city.iter_ranked_songs():
+                for kind, key in keys:
+                    aggregates[kind][key].add(song, rank)
+
+        last = len(self.weeks)
+        self.weeks.append(week)
+        self._trees.append(tree)
+        self._aggregates.append(aggregates)
+
+        for lo, hi, kind in [window for window in self._windows if window[1] == last]:
+            merged = self._windows.pop((lo, hi, kind))
+            self._merge_week(merged, last, kind)
+            self._windows[(lo, last + 1, kind)] = merged
+
+    def get_week(self, week: str) -> Optional[Tree]:
+        """Returns the World tree of the given week, or None if the week has not been appended.
+        """
+        i = bisect.bisect_left(self.weeks, week)
+        return self._trees[i] if i < len(self.weeks) and self.weeks[i] == week else None
+
+    def top_n(self, n: int, target: str | tuple[str, str], start: Optional[str] = None,
+              end: Optional[str] = None) -> list[tuple]:
+        """Returns the top n songs of the region named target over the weeks from start to end, in the format of
+        Tree.top_n, or [] if the target did not chart in the window. A city may be named by itself, like in
+        Tree.top_n, or by its (city, country) key.
+
+        Representation Invariants:
+            - n >= 1
+        """
+        for kind in ('World', 'continent', 'country', 'city'):
+            aggregates = self._window_aggregates(kind, start, end)
+            key = find_region_key(aggregates, target)
+            if key is not None:
+                return aggregates[key].top_n(n)
+        return []
+
+    def get_region_streams(self, kind: str, start: Optional[str] = None,
+                           end: Optional[str] = None) -> dict[str, int] | dict[tuple, int]:
+        """Returns dictionary mapping parts of a region with the total number of streams from their top 5 songs
+        over the weeks from start to end, like Tree.get_region_streams.
+
+        Preconditions:
+            - kind in {"continent", "country", "city"}
+        """
+        return {key: sum(song[2] for song in aggregate.top_n(5))
+                for key, aggregate in self._window_aggregates(kind, start, end).items()}
+
+    def get_region_top_songs(self, kind: str, start: Optional[str] = None,
+                             end: Optional[str] = None) -> dict[str, list[str]] | dict[tuple, list[str]]:
+        """Returns dictionary mapping parts of a region with lists of their top 5 songs over the weeks from start
+        to end, like Tree.get_region_top_songs.
+
+        Preconditions:
+            - kind in {"continent", "country", "city"}
+        """
+        return {key: [song[0] for song in aggregate.top_n(5)]
+                for key, aggregate in self._window_aggregates(kind, start, end).items()}
+
+    def region_personality(self, n: int, songs: list[str], region_range: str, ranked: bool = False,
+                           start: Optional[str] = None, end: Optional[str] = None) -> list[tuple[float, list[str]]]:
+        """Returns a list with the n regions charting between start and end with the highest similarity score to
+        the given songs over that window, in the format of Tree.region_personality.
+
+        Preconditions:
+            - n >= 1
+            - region_range in {'continent', 'country', 'city'}
+            - 1 <= len(songs) <= 5
+        """
+        scores = [(aggregate.comparison_score(songs, ranked), self._sequences[region_range][key])
+                  for key, aggregate in self._window_aggregates(region_range, start, end).items()
+                  if region_range != 'city' or key[0] != '0']
+        return heapq.nlargest(n, scores)
+
+    def _window_aggregates(self, kind: str, start: Optional[str], end: Optional[str]) -> dict[Any, RegionAggregate]:
+        """Returns a mapping from each region of the given kind charting in the weeks from start to end to its
+        aggregates over those weeks, merging and caching them if they are not already cached.
+        """
+        lo = 0 if start is None else bisect.bisect_left(self.weeks, start)
+        hi = len(self.weeks) if end is None else bisect.bisect_right(self.weeks, end)
+        if (lo, hi, kind) in self._windows:
+            # move the window to the end, as the most recently used
+            merged = self._windows.pop((lo, hi, kind))
+        else:
+            merged = {}
+            for week in range(lo, hi):
+                self._merge_week(merged, week, kind)
+            if len(self._windows) >= self.max_windows:
+                del self._windows[next(iter(self._windows))]
+        self._windows[(lo, hi, kind)] = merged
+        return merged
+
+    def _merge_week(self, merged: dict[Any, RegionAggregate], week: int, kind: str) -> None:
+        """Merges the aggregates of the regions of the given kind charting in the week at index week into merged.
+        """
+        for key, aggregate in self._aggregates[week][kind].items():
+            if key not in merged:
+                merged[key] = RegionAggregate()
+            merged[key].merge(aggregate)
+
+
+if __name__ == "__main__":
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['bisect', 'heapq', 'region_aggregates', 'storage'],
+        'max-line-length': 120
+    })
@@ -6,46 +6,426 @@ File Description
 =============================================================================
 This is the main file for running the program.
 """
+import array
 import csv
-import python_ta
+import functools
+import glob
+import hashlib
+import importlib
+import itertools
+import os
+import pickle
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from types import ModuleType
+from typing import Any, Iterable, Iterator, Optional
 from storage import Tree, Song
-from visualization import generate_region_df_by_streams, generate_region_df_by_score, visualize_world_song_data, \
-    all_options_table
+from chart_summaries import ChartHistory, ChartSummary
+
+
+SNAPSHOT_FORMAT = 3
+
+# the modules whose import cost is reported by python main.py --import-times
+STARTUP_MODULES = ['numpy', 'storage', 'pandas', 'plotly.graph_objects', 'plotly.express', 'geopandas',
+                   'country_converter', 'visualization', 'python_ta', 'main']
+
+
+def import_visualization() -> ModuleType:
+    """Returns the visualization module, importing it on first use.
+
+    The visualization module pulls in plotly, pandas, geopandas and country_converter, which take
+    seconds to import, so it is only imported once a map or table is actually requested. The text-only options
+    start without it.
+    """
+    return importlib.import_module('visualization')
+
+
+@functools.cache
+def get_figure_cache() -> Any:
+    """Returns the visualization.FigureCache of the maps drawn in this process, creating it on first use.
+
+    The cache and the GeoData it draws with live for the whole process, so leaving the visualizer and coming back
+    neither redraws the maps already seen nor reads the geographic data files again.
+    """
+    visualization = import_visualization()
+    return visualization.FigureCache(16, visualization.GeoData())
+
+
+def measure_import_times(modules: list[str]) -> dict[str, float]:
+    """Returns the number of seconds it takes to import each of the given modules, including every module it
+    imports in turn. Each module is imported in a fresh interpreter, so the times do not depend on each other.
+    """
+    code = 'import importlib, sys, time\n' \
+           'start = time.perf_counter()\n' \
+           'importlib.import_module(sys.argv[1])\n' \
+           'print(time.perf_counter() - start)'
+    times = {}
+    for module in modules:
+        result = subprocess.run([sys.executable, '-c', code, module], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        times[module] = float(result.stdout.split()[-1])
+    return times
+
+
+def load_spotify_tree(file_name: str, snapshot_file: Optional[str] = None) -> Tree:
+    """Returns the tree of the provided csv file of the top songs data, loading it from a binary snapshot when
+    the snapshot is up to date with the file, and otherwise building it and saving a new snapshot.
+
+    The snapshot defaults to the csv file's name with the extension ".snapshot". It is up to date if it records
+    the csv file's current modification time and size, or failing that, its SHA-256 hash. The snapshot holds the
+    file's parsed columns in a compact form rather than the tree itself (see pack_columns), so loading it skips
+    reading and parsing the csv file, and the tree is then built from the columns as usual.
+
+    >>> import tempfile
+    >>> directory = tempfile.TemporaryDirectory()
+    >>> file_name = os.path.join(directory.name, 'chart.csv')
+    >>> row = ['"idol, YOASOBI, 100"', '"Bling-Bang-Bang-Born, Creepy Nuts, 90"', '"Flowers, Miley Cyrus, 80"',
+    ...        '"Cruel Summer, Taylor Swift, 70"', '"Seven, Jung Kook, 60"']
+    >>> with open(file_name, 'w', encoding='utf8') as file:
+    ...     _ = file.write('Tokyo,Japan,Asia,' + ','.join(row) + '\\n')
+    ...     _ = file.write('Paris,France,Europe,' + ','.join(reversed(row)) + '\\n')
+    >>> built = load_spotify_tree(file_name)
+    >>> os.path.exists(os.path.join(directory.name, 'chart.snapshot'))
+    True
+    >>> loaded = load_spotify_tree(file_name)
+    >>> expected = initialize_spotify_file(file_name)
+    >>> all(tree.top_n(5, 'World') == expected.top_n(5, 'World') for tree in (built, loaded))
+    True
+    >>> loaded.top_n(2, 'Paris') == expected.top_n(2, 'Paris')
+    True
+    >>> directory.cleanup()
+    """
+    if snapshot_file is None:
+        snapshot_file = os.path.splitext(file_name)[0] + '.snapshot'
+
+    source = os.stat(file_name)
+    header = read_snapshot_header(snapshot_file)
+    digest = None
+    if header is not None and header.get('format') == SNAPSHOT_FORMAT:
+        unchanged = (header['mtime_ns'], header['size']) == (source.st_mtime_ns, source.st_size)
+        if not unchanged:
+            digest = hash_file(file_name)
+        if unchanged or header['sha256'] == digest:
+            columns = read_snapshot_columns(snapshot_file)
+            if columns is not None:
+                if not unchanged:
+                    # the file was only touched, so record its new modification time to skip hashing next time
+                    save_snapshot(columns, file_name, snapshot_file, digest)
+                return build_tree_from_columns(columns)
+
+    columns = parse_song_columns(read_spotify_columns(file_name))
+    save_snapshot(columns, file_name, snapshot_file, digest)
+    return build_tree_from_columns(columns)
+
+
+def save_snapshot(columns: dict[str, list], file_name: str, snapshot_file: str, digest: Optional[str] = None) -> None:
+    """Saves the given parsed columns, read from the csv file file_name, to snapshot_file, where digest is the
+    SHA-256 hex digest of file_name, or None if it has not been computed yet.
+
+    The snapshot holds a header identifying the csv file followed by the pickled result of pack_columns. It is
+    written to a temporary file first, so a snapshot is never left half written. The snapshot only speeds up the
+    next start, so nothing is saved if it cannot be written, such as when the directory is read-only.
+
+    Preconditions:
+        - columns is in the format returned by parse_song_columns
+    """
+    source = os.stat(file_name)
+    header = {'format': SNAPSHOT_FORMAT, 'mtime_ns': source.st_mtime_ns, 'size': source.st_size,
+              'sha256': hash_file(file_name) if digest is None else digest}
+    try:
+        with open(snapshot_file + '.tmp', 'wb') as file:
+            pickle.dump(header, file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(pack_columns(columns), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(snapshot_file + '.tmp', snapshot_file)
+    except OSError:
+        pass
+
+
+def read_snapshot_header(snapshot_file: str) -> Optional[dict]:
+    """Returns the header of the given snapshot file, or None if it does not exist or cannot be read.
+    """
+    try:
+        with open(snapshot_file, 'rb') as file:
+            header = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError, ValueError):
+        return None
+    return header if isinstance(header, dict) else None
+
+
+def read_snapshot_columns(snapshot_file: str) -> Optional[dict[str, list]]:
+    """Returns the parsed columns saved in the given snapshot file, or None if its body is corrupt or was written
+    in an incompatible format.
+    """
+    try:
+        with open(snapshot_file, 'rb') as file:
+            pickle.load(file)
+            return unpack_columns(pickle.load(file))
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError, KeyError,
+            TypeError, ValueError):
+        return None
+
+
+def pack_columns(columns: dict[str, list]) -> dict[str, Any]:
+    """Returns the given parsed columns in a compact form to be pickled, which unpack_columns turns back into
+    columns.
+
+    Each distinct region name and song is stored once, and the rows refer to them by their index in arrays
+    of integers, which pickle as raw bytes.
+
+    Preconditions:
+        - columns is in the format returned by parse_song_columns
+    """
+    names = {}
+    songs = {}
+    region_ids = array.array('i')
+    song_ids = array.array('i')
+    for i in range(len(columns['city'])):
+        for column in ('continent', 'country', 'city'):
+            region_ids.append(names.setdefault(columns[column][i], len(names)))
+        for s in range(5):
+            song_ids.append(songs.setdefault(columns['songs'][s][i], len(songs)))
+
+    return {'names': list(names), 'region_ids': region_ids,
+            'songs': [(song.title, song.artist, song.streams) for song in songs], 'song_ids': song_ids}
+
+
+def unpack_columns(packed: dict[str, Any], interned: Optional[dict[tuple, Song]] = None) -> dict[str, list]:
+    """Returns the parsed columns packed by pack_columns.
+
+    If interned is given, it is used as the table of songs created so far, as in create_song_object, so columns
+    unpacked with the same table share their songs. Region names and song strings are interned either way.
+
+    >>> columns = parse_song_columns({'city': ['Tokyo'], 'country': ['Japan'], 'continent': ['Asia'],
+    ...                               'songs': [[f'song {s}, yoasobi, 100'] for s in range(5)]})
+    >>> unpack_columns(pack_columns(columns)) == columns
+    True
+    """
+    names = [sys.intern(name) for name in packed['names']]
+    if interned is None:
+        interned = {}
+    songs = [intern_song(title, artist, streams, interned) for title, artist, streams in packed['songs']]
+    region_ids = packed['region_ids']
+    song_ids = packed['song_ids']
+    return {'city': [names[i] for i in region_ids[2::3]],
+            'country': [names[i] for i in region_ids[1::3]],
+            'continent': [names[i] for i in region_ids[0::3]],
+            'songs': [[songs[j] for j in song_ids[s::5]] for s in range(5)]}
+
+
+def hash_file(file_name: str) -> str:
+    """Returns the SHA-256 hex digest of the contents of the given file.
+    """
+    digest = hashlib.sha256()
+    with open(file_name, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
 
 def initialize_spotify_file(file_name: str) -> Tree:
     """Intializes this tree according to the provided csv file of the top songs data.
+
+    The file is read into columns first, then the tree is built bottom-up from the rows grouped by
+    continent, country and city, so no row has to search the tree for where its songs belong.
+    """
+    return build_tree_from_columns(parse_song_columns(read_spotify_columns(file_name)))
+
+
+def initialize_spotify_files(file_names: str | list[str], max_workers: Optional[int] = None) -> Tree:
+    """Returns one World tree holding the top songs data of every given csv file.
+
+    file_names is either a list of file names or a glob pattern such as 'charts/*.csv', whose matches are loaded
+    in sorted order. The files are read and parsed in parallel, in up to max_workers processes (by default, one
+    per CPU), and their columns are then joined in file order and built into one tree, so regions keep the order
+    in which they first appear across the files and a city found in several files holds the songs of all of them.
+
+    Preconditions:
+        - max_workers is None or max_workers >= 1
+    """
+    if isinstance(file_names, str):
+        file_names = sorted(glob.glob(file_names))
+    all_columns = read_file_columns(file_names, max_workers)
+    joined = {key: [] for key in ('city', 'country', 'continent')}
+    joined['songs'] = [[] for _ in range(5)]
+    for columns in all_columns:
+        for key in ('city', 'country', 'continent'):
+            joined[key].extend(columns[key])
+        for s in range(5):
+            joined['songs'][s].extend(columns['songs'][s])
+    return build_tree_from_columns(joined)
+
+
+def initialize_spotify_history(week_files: dict[str, str], max_workers: Optional[int] = None) -> ChartHistory:
+    """Returns a ChartHistory holding the chart of every week in week_files, which maps week labels (such as
+    '2024-01-01') to the csv file of the top songs data of that week.
+
+    The weekly files are read and parsed in parallel, in up to max_workers processes, and each week's tree is
+    then built from its columns (see initialize_spotify_files).
+
+    Preconditions:
+        - max_workers is None or max_workers >= 1
+    """
+    weeks = sorted(week_files)
+    history = ChartHistory()
+    for week, columns in zip(weeks, read_file_columns([week_files[week] for week in weeks], max_workers)):
+        history.append_week(week, build_tree_from_columns(columns))
+    return history
+
+
+def read_file_columns(file_names: list[str], max_workers: Optional[int] = None) -> list[dict[str, list]]:
+    """Returns the parsed columns of each of the given csv files, in order, read in up to max_workers processes.
+
+    A helper for initialize_spotify_files and initialize_spotify_history. The workers send back their columns
+    packed by pack_columns, which are much cheaper to pickle than trees, and the trees are built by the caller.
+    The columns of every file are unpacked with one table of songs, so a song charting in several files is
+    shared between them, as within one file.
+    """
+    if len(file_names) <= 1:
+        return [parse_song_columns(read_spotify_columns(file_name)) for file_name in file_names]
+    interned = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return [unpack_columns(packed, interned) for packed in executor.map(read_packed_columns, file_names)]
+
+
+def read_packed_columns(file_name: str) -> dict[str, Any]:
+    """Returns the parsed columns of the given csv file packed by pack_columns.
+
+    A helper for read_file_columns, run in its worker processes.
+    """
+    return pack_columns(parse_song_columns(read_spotify_columns(file_name)))
+
+
+def read_spotify_columns(file_name: str) -> dict[str, list]:
+    """Returns the provided csv file of the top songs data as columns.
+
+    The returned dictionary maps 'city', 'country' and 'continent' to the column of that region for each row,
+    and 'songs' to a list of 5 columns, where songs[i] holds the unparsed song string ranked i + 1 in each row.
+    """
+    with open(file_name, encoding="utf8") as file:
+        return rows_to_columns(csv.reader(file))
+
+
+def read_spotify_chunks(file_name: str, chunk_size: int) -> Iterator[dict[str, list]]:
+    """Lazily yields the provided csv file of the top songs data as columns, chunk_size rows at a time, in the
+    format returned by read_spotify_columns. Only one chunk is held in memory at a time.
+
+    Preconditions:
+        - chunk_size >= 1
     """
-    new_tree = Tree('World', [])
     with open(file_name, encoding="utf8") as file:
         reader = csv.reader(file)
-        for row in reader:
-            city = row[0]
-            country = row[1]
-            continent = row[2]
-            new_tree.insert_sequence([continent, country, city])
-            city = new_tree.navigate_sequence([continent, country, city])
-
-            # Note, countries without cities still have a city child labeled '0'
-            rank = 1
-            for s in range(3, 8):
-                song_obj = create_song_object(row[s], rank)
-                city.insert_sequence([song_obj])
-                rank += 1
-    return new_tree
-
-
-def create_song_object(string_data: str, rank: int) -> Song:
+        chunk = rows_to_columns(itertools.islice(reader, chunk_size))
+        while chunk['city']:
+            yield chunk
+            chunk = rows_to_columns(itertools.islice(reader, chunk_size))
+
+
+def rows_to_columns(rows: Iterable[list[str]]) -> dict[str, list]:
+    """Returns the given rows of top songs data as columns, in the format returned by read_spotify_columns.
+    """
+    columns = {'city': [], 'country': [], 'continent': [], 'songs': [[] for _ in range(5)]}
+    for row in rows:
+        columns['city'].append(row[0])
+        columns['country'].append(row[1])
+        columns['continent'].append(row[2])
+        for s in range(5):
+            columns['songs'][s].append(row[s + 3])
+    return columns
+
+
+def summarize_spotify_file(file_name: str, chunk_size: int = 10000, max_candidates: int = 100) -> ChartSummary:
+    """Returns a ChartSummary of the provided csv file of the top songs data, streamed chunk_size rows at a time.
+
+    Memory use is bounded by the chunk size and by max_candidates song titles per region. The number of regions
+    depends on the places the chart covers rather than on the length of the file, so a long history of the same
+    places is summarized in the same memory as a single week. The top songs reported for a region are exact only
+    when the region has at most max_candidates distinct titles (see RegionSummary).
+
+    Preconditions:
+        - chunk_size >= 1
+        - max_candidates >= 1
+    """
+    summary = ChartSummary(max_candidates)
+    interned = {}
+    for columns in read_spotify_chunks(file_name, chunk_size):
+        for i in range(len(columns['city'])):
+            songs = [create_song_object(columns['songs'][s][i], interned) for s in range(5)]
+            summary.add([columns['continent'][i], columns['country'][i], columns['city'][i]], songs)
+        # songs from earlier chunks are still referenced by the summary when they matter; do not keep the rest
+        interned.clear()
+    return summary
+
+
+def parse_song_columns(columns: dict[str, list]) -> dict[str, list]:
+    """Returns a copy of the given columns of top songs data with every song string parsed into a Song.
+
+    A song repeated in the columns is parsed into one shared Song (see create_song_object).
+
+    Preconditions:
+        - columns is in the format returned by read_spotify_columns
+    """
+    interned = {}
+    parsed = dict(columns)
+    parsed['songs'] = [[create_song_object(song, interned) for song in column] for column in columns['songs']]
+    return parsed
+
+
+def build_tree_from_columns(columns: dict[str, list]) -> Tree:
+    """Returns a World tree built from the given columns of top songs data.
+
+    A helper for initialize_spotify_file. Regions keep the order in which they first appear in the columns,
+    and a city listed in several rows holds the songs of all of them.
+
+    Preconditions:
+        - columns is in the format returned by parse_song_columns
+    """
+    # group the song subtrees of each row under their continent, country and city
+    grouped = {}
+    for i in range(len(columns['city'])):
+        countries = grouped.setdefault(columns['continent'][i], {})
+        cities = countries.setdefault(columns['country'][i], {})
+        # Note, countries without cities still have a city child labeled '0'
+        songs = cities.setdefault(columns['city'][i], [])
+        for s in range(5):
+            songs.append(Tree(columns['songs'][s][i], [], s + 1))
+
+    continents = []
+    for continent, countries in grouped.items():
+        country_trees = []
+        for country, cities in countries.items():
+            country_trees.append(Tree(country, [Tree(city, songs) for city, songs in cities.items()]))
+        continents.append(Tree(continent, country_trees))
+    return Tree('World', continents)
+
+
+def create_song_object(string_data: str, interned: Optional[dict[tuple, Song]] = None) -> Song:
     """Creates a Song object from the given string data.
 
     A helper for initialize_spotify_file.
 
     The string should be in the following format:
             "<title>, <main_artist>, <streams>"
+
+    If interned is given, it is used as a table of the songs created so far: a song already in it is returned
+    instead of a new copy, and new songs are added to it. Title and artist strings are interned either way, so
+    songs by the same artist share one artist string.
     """
     split_str = string_data.split(', ')
     title, artist, streams = split_str[0].lower().strip(), split_str[1].lower().strip(), int(split_str[2].strip())
-    return Song(title, artist, streams, rank)
+    return intern_song(title, artist, streams, interned)
+
+
+def intern_song(title: str, artist: str, streams: int, interned: Optional[dict[tuple, Song]] = None) -> Song:
+    """Returns the Song with the given title, artist and streams, taken from the interned table of songs if it is
+    given (see create_song_object). The title and artist strings are interned either way.
+    """
+    title, artist = sys.intern(title), sys.intern(artist)
+    if interned is None:
+        return Song(title, artist, streams)
+    elif (title, artist, streams) not in interned:
+        interned[(title, artist, streams)] = Song(title, artist, streams)
+    return interned[(title, artist, streams)]
 
 
 def get_personality_test(tree: Tree, available_songs: set[str]) -> None:
@@ -159,7 +539,7 @@ def get_user_top_songs(song_set: set[str]) -> list[str]:
         show_song_list = input("Enter your choice here: ").strip().lower()
 
     if show_song_list in {'y', 'yes'}:
-        all_options_table(song_set, 'song')
+        import_visualization().all_options_table(song_set, 'song')
 
     i = 1
     while i <= n:
@@ -270,12 +650,17 @@ def choice5(tree: Tree, countries: set) -> None:
     print("\n")
 
 
-def visualization_prompt(tree: Tree, song_set: set) -> None:
+def visualization_prompt(tree: Tree, song_set: set, figures: Any) -> None:
     """
     Facilitates needed descriptions and prompts to generate a visualization based on the user's inputs.
+
+    The maps are drawn with and cached in figures, a visualization.FigureCache (see get_figure_cache).
     """
     running = True
 
+    # converts every country name to ISO3 up front, in one batch, so drawing the maps never has to
+    figures.geo.iso3_codes({sequence[-1] for _, sequence in tree.iter_regions('country')})
+
     # graph descriptions
     print("==============================================================================\n"
           " Welcome to the visualizer! Please select one of the following graph options.\n"
@@ -312,8 +697,7 @@ def visualization_prompt(tree: Tree, song_set: set) -> None:
 
             # generate data frame and graph
             print("\nPlease wait a moment while we generate your map...")
-            vis_df = generate_region_df_by_streams(tree, top_5_region)
-            visualize_world_song_data(top_5_region, 'streams', vis_df)
+            figures.get_figure(tree, top_5_region, 'streams').show()
 
             # prompt for another graph
             print("\nA graph should have popped up in your browser!")
@@ -348,8 +732,7 @@ def visualization_prompt(tree: Tree, song_set: set) -> None:
 
             # generate data frame and graph
             print("\nPlease wait a moment while we generate your map...")
-            vis_df = generate_region_df_by_score(tree, user_songs, sim_score_region, rank_op)
-            visualize_world_song_data(sim_score_region, 'scores', vis_df)
+            figures.get_figure(tree, sim_score_region, 'scores', user_songs, rank_op).show()
 
             # prompt for another graph
             print("\nA graph should have popped up in your browser!")
@@ -363,21 +746,31 @@ def visualization_prompt(tree: Tree, song_set: set) -> None:
 
 
 if __name__ == "__main__":
+    # startup time measurement mode: python main.py --import-times reports the import cost of each module
+    if len(sys.argv) == 2 and sys.argv[1] == '--import-times':
+        for module_name, seconds in measure_import_times(STARTUP_MODULES).items():
+            print(f"{module_name:<24}{seconds * 1000:>10.1f} ms")
+        sys.exit()
+
     tree_file = "FINAL_DATA.csv"
-    spotify_tree = initialize_spotify_file(tree_file)  # Make sure this is consistent with file names
+    spotify_tree = load_spotify_tree(tree_file)  # Make sure this is consistent with file names
+
+    # batch export mode: python main.py --export <directory> writes every map to static files and exits
+    if len(sys.argv) == 3 and sys.argv[1] == '--export':
+        exported = import_visualization().export_all_maps(spotify_tree, sys.argv[2])
+        print(f"{len(exported)} maps written to {sys.argv[2]}")
+        sys.exit()
 
     # Initializes sets containing all song titles and location titles in the tree
     all_continents = set()
     all_countries = set()
     all_cities = set()
     all_songs = set()
-    for curr_city in spotify_tree.get_all_cities_sequence():
+    for curr_city in spotify_tree.iter_regions('city'):
         all_continents.add(curr_city[1][0])
         all_countries.add(curr_city[1][1])
         all_cities.add(curr_city[1][2])
-
-        for song in curr_city[0].get_songs():
-            all_songs.add(song.title)
+        all_songs.update(song.title for song in curr_city[0].iter_songs())
 
     all_cities.discard('0')  # removes the instances where a country doesn't have a city
     all_choice = all_continents.union(all_countries).union(all_cities)
@@ -426,27 +819,32 @@ if __name__ == "__main__":
         elif choice == "7":
             run_recommendation(spotify_tree, all_songs)
         elif choice == "8":
-            visualization_prompt(spotify_tree, all_songs)
+            visualization_prompt(spotify_tree, all_songs, get_figure_cache())
         elif choice == "9":
             stop = True
         elif choice == 'a':
             print('\nGenerating Table...\n')
-            all_options_table(all_continents, 'continent')
+            import_visualization().all_options_table(all_continents, 'continent')
         elif choice == 'b':
             print('\nGenerating Table...\n')
-            all_options_table(all_countries, 'country')
+            import_visualization().all_options_table(all_countries, 'country')
         elif choice == 'c':
             print('\nGenerating Table...\n')
-            all_options_table(all_cities, 'city')
+            import_visualization().all_options_table(all_cities, 'city')
         elif choice == 'd':
             print('\nGenerating Table...\n')
-            all_options_table(all_songs, 'song')
+            import_visualization().all_options_table(all_songs, 'song')
 
     print("Thank you for using the Spotify visualization program, we hope you enjoyed it!")
 
+    # imported here rather than at the top, so that running the program does not pay for importing python_ta
+    import python_ta
+
     python_ta.check_all(config={
         # the names (strs) of imported modules
-        'extra-imports': ['storage', 'csv', 'visualization'],
+        'extra-imports': ['storage', 'array', 'csv', 'concurrent.futures', 'functools', 'glob', 'hashlib', 'importlib',
+                          'itertools', 'os', 'pickle', 'subprocess', 'sys', 'types', 'visualization',
+                          'chart_summaries'],
         "forbidden-io-functions": [],  # allows for print and input functions  
         'max-line-length': 120
     })
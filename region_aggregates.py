@@ -0,0 +1,366 @@
+"""
+CSC111 Project 2: Wrap Mapped, Unpacked
+Authors: Colleen Chang, Richard Li, Roy Liu, Mina (Chieh-Yi) Wu
+
+File Description
+=============================================================================
+This file contains the aggregates that a Tree keeps over its regions so that its queries do not have to walk
+every song leaf: the running aggregates of each region, and the matrices of region scores and country overlaps.
+
+"""
+from __future__ import annotations
+import heapq
+from typing import Optional
+
+import numpy as np
+
+
+class RegionSongMatrix:
+    """A sparse region x song incidence matrix used to compute the comparison scores of many regions at once.
+
+    Each row is a region and each column is a (song title, rank) pair; an entry counts how many times the song
+    appears in the region at that rank. The comparison score of every region to a list of songs (see
+    Tree.get_comparison_score) is then one sparse matrix-vector product with a vector holding the score of each
+    (title, rank) pair. Scores are summed in fifths so that the totals are exact integers.
+
+    The matrix is also stored by column, as an inverted index from each (title, rank) pair to the regions
+    containing it, so that the regions sharing a song with a short list of songs can be scored without
+    touching the others.
+
+    Instance Attributes:
+      - sequences: the sequence from a continent to each region, in row order
+
+    Representation Invariants:
+        - len(self._indptr) == len(self.sequences) + 1
+        - len(self._indices) == len(self._counts) == self._indptr[-1]
+
+    >>> from storage import Song, Tree
+    >>> tree = Tree('World', [])
+    >>> tree.insert_sequence(['Asia', 'Japan', 'Tokyo', Song('idol', 'yoasobi', 100)], 1)
+    >>> tree.insert_sequence(['Asia', 'Japan', 'Tokyo', Song('bling-bang-bang-born', 'creepy nuts', 90)], 2)
+    >>> tree.insert_sequence(['Asia', 'Japan', 'Osaka', Song('bling-bang-bang-born', 'creepy nuts', 90)], 1)
+    >>> tree.insert_sequence(['Europe', 'France', 'Paris', Song('flowers', 'miley cyrus', 80)], 1)
+    >>> regions = list(tree.iter_regions('city'))
+    >>> matrix = RegionSongMatrix(regions)
+    >>> songs = ['bling-bang-bang-born', 'idol']
+    >>> matrix.scores(songs, ranked=True) == [city.get_comparison_score(songs, True) for city, _ in regions]
+    True
+    >>> matrix.scores(songs)
+    [1.0, 1.0, 0.0]
+    """
+    # Private Instance Attributes:
+    #   - _indptr, _indices, _counts:
+    #       The matrix in CSR form: the entries of row i are in positions range(_indptr[i], _indptr[i + 1])
+    #       of _indices (the column of each entry) and _counts (the value of each entry).
+    #   - _col_indptr, _col_rows, _col_counts:
+    #       The same matrix in CSC form (the inverted index): the regions containing column j are
+    #       _col_rows[_col_indptr[j]:_col_indptr[j + 1]], with the matching counts in _col_counts.
+    #   - _sizes:
+    #       The number of songs (placements) in each region.
+    #   - _columns:
+    #       A mapping from each song title to the (rank, column) pairs of that title.
+    #   - _num_columns:
+    #       The number of columns of the matrix.
+    sequences: list[list[str]]
+    _indptr: np.ndarray
+    _indices: np.ndarray
+    _counts: np.ndarray
+    _col_indptr: np.ndarray
+    _col_rows: np.ndarray
+    _col_counts: np.ndarray
+    _sizes: np.ndarray
+    _columns: dict[str, list[tuple[int, int]]]
+    _num_columns: int
+
+    def __init__(self, regions: list[tuple['Tree', list[str]]]) -> None:
+        """Initialize the incidence matrix of the given (region, sequence) pairs.
+        """
+        self.sequences = [sequence for _, sequence in regions]
+        self._columns = {}
+        column_ids = {}
+        indptr, indices, counts, sizes = [0], [], [], []
+
+        for region, _ in regions:
+            row = {}
+            size = 0
+            for song, rank in region.iter_ranked_songs():
+                size += 1
+                if (song.title, rank) not in column_ids:
+                    column_ids[(song.title, rank)] = len(column_ids)
+                    self._columns.setdefault(song.title, []).append((rank, column_ids[(song.title, rank)]))
+                column = column_ids[(song.title, rank)]
+                row[column] = row.get(column, 0) + 1
+            indices.extend(row)
+            counts.extend(row.values())
+            indptr.append(len(indices))
+            sizes.append(size)
+
+        self._indptr = np.array(indptr, dtype=np.int64)
+        self._indices = np.array(indices, dtype=np.int64)
+        self._counts = np.array(counts, dtype=np.int64)
+        self._sizes = np.array(sizes, dtype=np.int64)
+        self._num_columns = len(column_ids)
+
+        # transpose into the inverted index
+        rows = np.repeat(np.arange(len(regions), dtype=np.int64), np.diff(self._indptr))
+        order = np.argsort(self._indices, kind='stable')
+        self._col_rows = rows[order]
+        self._col_counts = self._counts[order]
+        self._col_indptr = np.concatenate(([0], np.cumsum(np.bincount(self._indices, minlength=self._num_columns))))
+
+    def _column_weights(self, songs: list[str], ranked: bool) -> dict[int, int]:
+        """Returns the score, in fifths, of each (title, rank) column matching one of the given songs.
+        """
+        weights = {}
+        for i in range(len(songs)):
+            for rank, column in self._columns.get(songs[i], []):
+                weights[column] = 5 - abs(i + 1 - rank) if ranked else 5
+        return weights
+
+    def scores(self, songs: list[str], ranked: bool = False) -> list[float]:
+        """Returns the comparison score of each region to the given songs, in row order, rounded to the 5th
+        decimal place like Tree.get_comparison_score.
+
+        Preconditions:
+            - 1 <= len(songs) <= 5
+        """
+        vector = np.zeros(self._num_columns, dtype=np.int64)
+        for column, weight in self._column_weights(songs, ranked).items():
+            vector[column] = weight
+
+        prefix = np.concatenate(([0], np.cumsum(self._counts * vector[self._indices])))
+        totals = prefix[self._indptr[1:]] - prefix[self._indptr[:-1]]
+        return [round(int(totals[i]) / (5 * int(self._sizes[i])), 5) if self._sizes[i] > 0 else 0.0
+                for i in range(len(self._sizes))]
+
+    def matching_scores(self, songs: list[str], ranked: bool = False) -> dict[int, float]:
+        """Returns a mapping from each row containing at least one of the given songs to that region's comparison
+        score. Every other region scores 0.0.
+
+        Only the inverted index entries of the given songs are read.
+
+        Preconditions:
+            - 1 <= len(songs) <= 5
+
+        >>> from storage import Song, Tree
+        >>> tree = Tree('World', [])
+        >>> tree.insert_sequence(['Asia', 'Japan', 'Tokyo', Song('idol', 'yoasobi', 100)], 1)
+        >>> tree.insert_sequence(['Asia', 'Japan', 'Osaka', Song('bling-bang-bang-born', 'creepy nuts', 90)], 1)
+        >>> tree.insert_sequence(['Asia', 'Japan', 'Osaka', Song('idol', 'yoasobi', 100)], 2)
+        >>> matrix = RegionSongMatrix(list(tree.iter_regions('city')))
+        >>> matrix.matching_scores(['idol'], ranked=True)
+        {0: 1.0, 1: 0.4}
+        >>> matrix.matching_scores(['flowers'])
+        {}
+        """
+        rows, points = [], []
+        for column, weight in self._column_weights(songs, ranked).items():
+            start, end = self._col_indptr[column], self._col_indptr[column + 1]
+            rows.append(self._col_rows[start:end])
+            points.append(self._col_counts[start:end] * weight)
+        if not rows:
+            return {}
+
+        matched_rows, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(points))
+        return {int(row): round(int(totals[i]) / (5 * int(self._sizes[row])), 5)
+                for i, row in enumerate(matched_rows)}
+
+
+class CountryOverlapMatrix:
+    """A dense matrix of how many of the top 5 artists (or songs) of each country appear in the top 5 of every other
+    country.
+
+    Entry [i, j] is the number of items in the top 5 list of country j that are also in the top 5 list of country i,
+    which is the score used by Tree.most_common_artist_country and Tree.most_common_song_country.
+
+    Instance Attributes:
+      - countries: the names of the countries, in row order
+      - version: the value of Tree._version when the top 5 lists were last read from the tree
+
+    Representation Invariants:
+        - self._counts.shape == (len(self.countries), len(self.countries))
+    """
+    # Private Instance Attributes:
+    #   - _positions:
+    #       A mapping from each country name to its row.
+    #   - _tops:
+    #       The top 5 list of each country, in row order.
+    #   - _counts:
+    #       The overlap counts.
+    countries: list[str]
+    version: int
+    _positions: dict[str, int]
+    _tops: list[list[str]]
+    _counts: np.ndarray
+
+    def __init__(self, tops: dict[str, list[str]]) -> None:
+        """Initialize the overlap matrix of the given mapping from each country to its top 5 list.
+        """
+        self.countries = list(tops)
+        self.version = 0
+        self._positions = {self.countries[k]: k for k in range(len(self.countries))}
+        self._tops = list(tops.values())
+        self._counts = np.zeros((len(self.countries), len(self.countries)), dtype=np.int64)
+
+        # inverted index from each item to the countries listing it, and how many times they do
+        postings = {}
+        for j in range(len(self._tops)):
+            for item in self._tops[j]:
+                postings.setdefault(item, {})
+                postings[item][j] = postings[item].get(j, 0) + 1
+
+        for i in range(len(self._tops)):
+            for item in set(self._tops[i]):
+                for j, count in postings[item].items():
+                    self._counts[i, j] += count
+
+    def update(self, tops: dict[str, list[str]]) -> None:
+        """Refreshes the rows and columns of the countries whose top 5 list differs from the one in tops.
+
+        Preconditions:
+            - list(tops) == self.countries
+        """
+        for country, top in tops.items():
+            i = self._positions[country]
+            if top != self._tops[i]:
+                self._tops[i] = top
+                self._counts[i] = self._overlap_row(top)
+                self._counts[:, i] = [sum(1 for item in top if item in set(other)) for other in self._tops]
+
+    def _overlap_row(self, top: list[str]) -> list[int]:
+        """Returns the number of items in each country's top 5 list that are in the given top 5 list.
+        """
+        top_set = set(top)
+        return [sum(1 for item in other if item in top_set) for other in self._tops]
+
+    def most_common(self, region: str, top: list[str]) -> str:
+        """Returns the country, other than region, with the most items of its top 5 list in the given top 5 list of
+        region. Ties go to the country listed first in the tree.
+
+        region does not have to be a country; its row is then computed from top.
+
+        Raises IndexError if no other country shares any item with region.
+
+        >>> matrix = CountryOverlapMatrix({'Japan': ['a', 'b'], 'Korea': ['b', 'c'], 'France': ['c', 'd', 'b']})
+        >>> matrix.most_common('Japan', ['a', 'b'])
+        'Korea'
+        >>> matrix.most_common('Asia', ['c', 'd'])
+        'France'
+        >>> matrix.update({'Japan': ['c', 'd'], 'Korea': ['b', 'c'], 'France': ['c', 'd', 'b']})
+        >>> matrix.most_common('Japan', ['c', 'd'])
+        'France'
+        >>> matrix.most_common('Asia', ['e'])
+        Traceback (most recent call last):
+        ...
+        IndexError: no other country shares a top 5 item with Asia
+        """
+        if region in self._positions:
+            row = self._counts[self._positions[region]].copy()
+            row[self._positions[region]] = 0
+        else:
+            row = np.array(self._overlap_row(top), dtype=np.int64)
+
+        if len(row) == 0 or row.max() == 0:
+            raise IndexError(f'no other country shares a top 5 item with {region}')
+        return self.countries[int(np.argmax(row))]
+
+
+class RegionAggregate:
+    """Running aggregates of the song leaves in one region, which can be merged with those of other regions or
+    other weeks without looking at the songs again.
+
+    Instance Attributes:
+      - num_songs: the number of song leaves in this region
+      - total_streams: the sum of the streams of every song leaf in this region
+      - counts: a mapping from each song title to the number of leaves with that title, in the order the titles
+        were first added
+      - ranked_counts: a mapping from each (title, rank) pair to the number of leaves with that title and rank
+      - latest: a mapping from each song title to the last Song added with that title
+
+    Representation Invariants:
+        - self.num_songs == sum(self.counts.values()) == sum(self.ranked_counts.values())
+        - self.counts.keys() == self.latest.keys()
+    """
+    num_songs: int
+    total_streams: int
+    counts: dict[str, int]
+    ranked_counts: dict[tuple[str, Optional[int]], int]
+    latest: dict[str, 'Song']
+
+    def __init__(self) -> None:
+        """Initialize an empty aggregate.
+        """
+        self.num_songs = 0
+        self.total_streams = 0
+        self.counts = {}
+        self.ranked_counts = {}
+        self.latest = {}
+
+    def add(self, song: 'Song', rank: Optional[int]) -> None:
+        """Records one leaf holding the given song at the given rank.
+        """
+        self.num_songs += 1
+        self.total_streams += song.streams
+        self.counts[song.title] = self.counts.get(song.title, 0) + 1
+        self.ranked_counts[(song.title, rank)] = self.ranked_counts.get((song.title, rank), 0) + 1
+        self.latest[song.title] = song
+
+    def merge(self, other: RegionAggregate) -> None:
+        """Adds the aggregates of other into this aggregate, as if its leaves had been added after this one's.
+        """
+        self.num_songs += other.num_songs
+        self.total_streams += other.total_streams
+        for title, count in other.counts.items():
+            self.counts[title] = self.counts.get(title, 0) + count
+        for key, count in other.ranked_counts.items():
+            self.ranked_counts[key] = self.ranked_counts.get(key, 0) + count
+        self.latest.update(other.latest)
+
+    def top_n(self, n: int) -> list[tuple]:
+        """Returns a list of tuple with the top n songs of this region, their artists, and streams, in the format
+        of Tree.top_n.
+        """
+        top_titles = heapq.nlargest(n, self.counts, key=self.counts.get)
+        return [(title, self.latest[title].artist, self.latest[title].streams) for title in top_titles]
+
+    def comparison_score(self, songs: list[str], ranked: bool = False) -> float:
+        """Returns the comparison score of this region to the provided songs list, as defined by
+        Tree.get_comparison_score.
+
+        Preconditions:
+            - 1 <= len(songs) <= 5
+
+        >>> from storage import Song
+        >>> aggregate = RegionAggregate()
+        >>> aggregate.add(Song('idol', 'yoasobi', 100), 1)
+        >>> aggregate.add(Song('bling-bang-bang-born', 'creepy nuts', 90), 2)
+        >>> aggregate.comparison_score(['idol'])
+        0.5
+        >>> aggregate.comparison_score(['bling-bang-bang-born', 'idol'], ranked=True)
+        0.8
+        >>> aggregate.comparison_score(['idol', 'idol'])
+        0.5
+        """
+        if self.num_songs == 0:
+            return 0.0
+
+        # a song listed more than once is scored once, at its last position, as in Tree.get_comparison_score
+        positions = {songs[i]: i + 1 for i in range(len(songs))}
+        total_score = 0.0
+        for title, position in positions.items():
+            for rank in range(1, 6):
+                count = self.ranked_counts.get((title, rank), 0)
+                total_score += count * (1 - abs(position - rank) / 5 if ranked else 1)
+            if not ranked:
+                total_score += self.ranked_counts.get((title, None), 0)
+        return round(total_score / self.num_songs, 5)
+
+
+if __name__ == "__main__":
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['heapq', 'numpy', 'storage'],
+        'max-line-length': 120
+    })
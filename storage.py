@@ -8,8 +8,11 @@ This file contains necessary classes for the program.
 
 """
 from __future__ import annotations
-from typing import Any, Optional, Union
-import python_ta
+import heapq
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional, Union
+
+from region_aggregates import CountryOverlapMatrix, RegionAggregate, RegionSongMatrix
 
 
 class Tree:
@@ -18,6 +21,7 @@ class Tree:
           Representation Invariants:
                   - self._root is not None or self._subtrees == []
                   - all(not subtree.is_empty() for subtree in self._subtrees)
+                  - all(isinstance(s._root, Song) or self._children[s._root] in self._subtrees for s in self._subtrees)
           """
     # Private Instance Attributes:
     #   - _root:
@@ -26,21 +30,101 @@ class Tree:
     #       The list of subtrees of this tree. This attribute is empty when
     #       self._root is None (representing an empty tree). However, this attribute
     #       may be empty when self._root is not None, which represents a tree consisting
-    #       of just one item.
+    #       of just one item. Song leaves are the most numerous trees, so a song leaf without
+    #       subtrees holds the shared empty tuple instead of its own empty list.
+    #   - _children:
+    #       A mapping from the root of each subtree to that subtree, kept in sync with
+    #       self._subtrees so that a child can be found without scanning its siblings.
+    #       If two subtrees share a root, the first one in self._subtrees is kept. Song leaves are
+    #       not included: a city may hold the same song more than once, e.g. at two ranks.
+    #       This is None until the tree has a (non-Song) subtree, so leaves do not carry an empty mapping.
+    #   - _parent:
+    #       The tree this tree is a subtree of, or None if it is not a subtree. Inserts made through a subtree
+    #       follow these links up, so that every tree above the inserted item knows about it.
+    #   - _region_index:
+    #       A mapping from the name of every region (non-Song) descendant of this tree to a list of those
+    #       subtrees, in insertion order. Each region is also keyed by a (name, parent name) tuple, so a city can
+    #       be looked up as (city, country) when its name alone is ambiguous. This is None until the tree has a
+    #       region descendant.
+    #   - _rank:
+    #       The rank of this tree's root on the edge from its parent, i.e. the rank of a song in its
+    #       city's chart. Songs are shared between cities, so the rank lives here rather than on the Song.
+    #       This is None for trees that are not ranked song leaves.
+    #   - _aggregate:
+    #       The running RegionAggregate of every song leaf below this tree, so the top songs and stream totals of
+    #       a region never need a traversal. Whenever a song leaf is inserted, through this tree or any tree
+    #       below it, the aggregates of all the trees above the leaf are updated, so this is always current.
+    #       This is None for song leaves themselves.
+    #   - _caches:
+    #       The cached query results of this tree, or None until the tree is first queried, so that only the trees
+    #       queried directly (usually just the World tree) hold caches. It maps:
+    #         - 'version' to the value of Tree._version when the 'top_n' and 'score_matrices' caches were filled
+    #         - 'top_n' to a mapping from (target, n) to the result of self.top_n(n, target)
+    #         - 'score_matrices' to a mapping from a region kind ('continent', 'country' or 'city') to the
+    #           RegionSongMatrix of the regions of that kind in this tree
+    #         - 'country_overlaps' to a mapping from 'artist' or 'song' to the CountryOverlapMatrix of this tree's
+    #           countries. Unlike the caches above, it is not discarded when the tree changes; it is refreshed for
+    #           the changed countries only.
+    #
+    # Private Class Attributes:
+    #   - _version:
+    #       A counter that is bumped every time a subtree is added to any Tree. An insert may change the results
+    #       of top_n on any tree above it, so cached results are discarded whenever this counter moves, without
+    #       having to find out which trees an insert affected.
+    __slots__: tuple[str, ...] = ('_root', '_subtrees', '_children', '_parent', '_region_index', '_rank',
+                                  '_aggregate', '_caches')
     _root: Optional[Any]
-    _subtrees: list[Tree]
+    _subtrees: list[Tree] | tuple[()]
+    _children: Optional[dict[Any, Tree]]
+    _parent: Optional[Tree]
+    _region_index: Optional[dict[Any, list[Tree]]]
+    _rank: Optional[int]
+    _aggregate: Optional[RegionAggregate]
+    _caches: Optional[dict[str, Any]]
+    _version: int = 0
 
-    def __init__(self, root: Optional[Any], subtrees: list[Tree]) -> None:
+    def __init__(self, root: Optional[Any], subtrees: list[Tree], rank: Optional[int] = None) -> None:
         """
         Initialize a new Tree with the given root value and subtrees.
 
-        If root is None, the tree is empty.
+        If root is None, the tree is empty. rank is the rank of a song leaf within its city's chart, which every
+        song leaf must have, so a ValueError is raised if root is a Song and rank is None.
 
         Preconditions:
             - root is not none or subtrees == []
+            - rank is None or 1 <= rank <= 5
+            - no tree in subtrees is a subtree of another tree
         """
+        if isinstance(root, Song) and rank is None:
+            raise ValueError(f'song leaf {root.title!r} needs a rank')
         self._root = root
-        self._subtrees = subtrees
+        self._subtrees = subtrees if subtrees or not isinstance(root, Song) else ()
+        self._children = None
+        self._parent = None
+        self._region_index = None
+        self._rank = rank
+        self._aggregate = None if isinstance(root, Song) else RegionAggregate()
+        self._caches = None
+        for subtree in subtrees:
+            self._register_child(subtree)
+            self._index_region(subtree)
+            if subtree._aggregate is None:
+                self._aggregate.add(subtree._root, subtree._rank)
+            else:
+                self._aggregate.merge(subtree._aggregate)
+            if subtree._region_index is not None:
+                if self._region_index is None:
+                    self._region_index = {}
+                for key, regions in subtree._region_index.items():
+                    self._region_index.setdefault(key, []).extend(regions)
+
+    def get_version(self) -> int:
+        """Return a number that changes whenever this tree may have changed since it was last called.
+
+        This is the counter of inserts into any tree, which is also what invalidates this tree's own cached query
+        results.
+        """
+        return Tree._version
 
     def is_empty(self) -> bool:
         """
@@ -65,13 +149,10 @@ class Tree:
         >>> len(t2)
         3
         """
-        if self.is_empty():
-            return 0
-        else:
-            size = 1  # count the root
-            for subtree in self._subtrees:
-                size += subtree.__len__()  # could also write len(subtree)
-            return size
+        size = 0
+        for _ in self._preorder():
+            size += 1
+        return size
 
     def __contains__(self, item: Any) -> bool:
         """
@@ -85,15 +166,7 @@ class Tree:
         >>> t.__contains__(4)
         False
         """
-        if self.is_empty():
-            return False
-        elif self._root == item:
-            return True
-        else:
-            for subtree in self._subtrees:
-                if subtree.__contains__(item):
-                    return True
-            return False
+        return any(subtree._root == item for subtree, _ in self._preorder())
 
     def __str__(self) -> str:
         """Return a string representation of this tree.
@@ -109,18 +182,33 @@ class Tree:
         """Return an indented string representation of this tree.
 
         The indentation level is specified by the <depth> parameter.
+
+        >>> print(Tree(1, [Tree(2, [Tree(3, [])]), Tree(4, [])])._str_indented(1), end='')
+          1
+            2
+              3
+            4
         """
-        if self.is_empty():
-            return ''
-        else:
-            str_so_far = '  ' * depth + f'{self._root}\n'
-            for subtree in self._subtrees:
-                # Note that the 'depth' argument to the recursive call is
-                # modified.
-                str_so_far += subtree._str_indented(depth + 1)
-            return str_so_far
-
-    def insert_sequence(self, items: list) -> None:
+        return ''.join(['  ' * (depth + subtree_depth) + f'{subtree._root}\n'
+                        for subtree, subtree_depth in self._preorder()])
+
+    def _preorder(self) -> Iterator[tuple[Tree, int]]:
+        """Yields every non-empty tree in this tree (this tree, then its descendants) in pre-order, each with its
+        depth below this tree.
+
+        The traversal uses an explicit stack instead of recursion, so it is not limited by the depth of the tree.
+
+        >>> t = Tree(1, [Tree(2, [Tree(3, [])]), Tree(4, [])])
+        >>> [(subtree._root, depth) for subtree, depth in t._preorder()]
+        [(1, 0), (2, 1), (3, 2), (4, 1)]
+        """
+        stack = [(self, 0)] if not self.is_empty() else []
+        while stack:
+            tree, depth = stack.pop()
+            yield tree, depth
+            stack.extend((subtree, depth + 1) for subtree in reversed(tree._subtrees))
+
+    def insert_sequence(self, items: list, rank: Optional[int] = None) -> None:
         """Inserts a sequence of items into this tree.
 
         (Definition from CSC111 Exercise 2)
@@ -130,35 +218,148 @@ class Tree:
         - items[2] is a child of items[1]
         - etc.
 
+        If the last item is newly inserted, its tree is given the provided rank. A Song is always inserted as a
+        new leaf, even if the same song is already there, since a city may chart a song more than once, and must be
+        given a rank (a ValueError is raised otherwise).
+
+        This tree may itself be a subtree of a larger tree: every tree above a newly inserted item is updated,
+        not only the trees from this one down.
+
         Preconditions:
             - not self.is_empty()
+            - not isinstance(items[-1], Song) or rank is not None
+
+        >>> t = Tree('World', [])
+        >>> t.insert_sequence(['Asia', 'Japan', 'Tokyo'])
+        >>> t.navigate_sequence(['Asia']).insert_sequence(['Korea', 'Seoul'])
+        >>> t.find_regions('Korea') == [t.navigate_sequence(['Asia', 'Korea'])]
+        True
+        >>> t.navigate_sequence(['Asia', 'Japan', 'Tokyo']).insert_sequence([Song('idol', 'yoasobi', 100)], 1)
+        >>> t.top_n(5, 'Japan'), t.get_region_streams('country')
+        ([('idol', 'yoasobi', 100)], {'Japan': 100, 'Korea': 0})
+        >>> t.insert_sequence(['Asia', 'Japan', 'Tokyo', Song('idol', 'yoasobi', 100)], 2)
+        >>> len(t.navigate_sequence(['Asia', 'Japan', 'Tokyo']))
+        3
         """
-        if items:
-            in_subtrees = False
-            for subtree in self._subtrees:
-                if subtree._root == items[0] and not in_subtrees:
-                    subtree.insert_sequence(items[1:])
-                    in_subtrees = True
+        if items and isinstance(items[-1], Song) and rank is None:
+            # checked before anything is inserted, so a rejected sequence leaves no regions behind
+            raise ValueError(f'song leaf {items[-1].title!r} needs a rank')
+
+        curr = self
+        for i in range(len(items)):
+            if not isinstance(items[i], Song) and curr._children is not None and items[i] in curr._children:
+                curr = curr._children[items[i]]
+            else:
+                new_tree = Tree(items[i], [], rank if i == len(items) - 1 else None)
+                curr._add_subtree(new_tree)
+
+                # register the new region or song with every tree above it
+                ancestor = curr
+                while ancestor is not None:
+                    ancestor._index_region(new_tree)
+                    if new_tree._aggregate is None:
+                        ancestor._aggregate.add(new_tree._root, new_tree._rank)
+                    ancestor = ancestor._parent
+                curr = new_tree
 
-            if not in_subtrees:
-                new_tree = Tree(items[0], [])
-                new_tree.insert_sequence(items[1:])
-                self._subtrees.append(new_tree)
+    def _add_subtree(self, subtree: Tree) -> None:
+        """Appends the given subtree to this tree's subtrees and registers it in the child index.
+
+        Preconditions:
+            - not subtree.is_empty()
+        """
+        if not isinstance(self._subtrees, list):
+            self._subtrees = []
+        self._subtrees.append(subtree)
+        self._register_child(subtree)
+        Tree._version += 1
+
+    def _register_child(self, subtree: Tree) -> None:
+        """Makes this tree the parent of the given subtree and records it in the child index, unless it is a
+        song leaf.
+        """
+        subtree._parent = self
+        if not isinstance(subtree._root, Song):
+            if self._children is None:
+                self._children = {}
+            self._children.setdefault(subtree._root, subtree)
+
+    def _index_region(self, region: Tree) -> None:
+        """Records the given descendant of this tree in this tree's region index under both its name and its
+        (name, parent name) pair. Song leaves are not indexed.
+        """
+        if not isinstance(region._root, Song):
+            if self._region_index is None:
+                self._region_index = {}
+            self._region_index.setdefault(region._root, []).append(region)
+            self._region_index.setdefault((region._root, region._parent._root), []).append(region)
+
+    def find_regions(self, target: Any) -> list[Tree]:
+        """Returns every region in this tree (including this tree itself) whose name is target, in the order a
+        pre-order depth-first search would reach them.
+
+        target may also be a (name, parent name) tuple, e.g. (city, country), to narrow the search.
+
+        >>> t = Tree('World', [])
+        >>> t.insert_sequence(['Asia', 'Singapore', 'Singapore'])
+        >>> t.insert_sequence(['Asia', 'Japan', '0'])
+        >>> t.insert_sequence(['Europe', 'Austria', '0'])
+        >>> [len(region) for region in t.find_regions('Singapore')]
+        [2, 1]
+        >>> len(t.find_regions('0'))
+        2
+        >>> t.find_regions(('0', 'Austria')) == [t.navigate_sequence(['Europe', 'Austria', '0'])]
+        True
+
+        A city found before a country of the same name comes first, even though it is deeper in the tree.
+
+        >>> t = Tree('World', [])
+        >>> t.insert_sequence(['North America', 'United States', 'Georgia'])
+        >>> t.insert_sequence(['Asia', 'Georgia', 'Tbilisi'])
+        >>> [len(region) for region in t.find_regions('Georgia')]
+        [1, 2]
+        """
+        regions = [self] if self._root == target else []
+        matches = self._region_index.get(target, []) if self._region_index is not None else []
+        if len(matches) > 1:
+            matches = sorted(matches, key=self._preorder_position)
+        regions.extend(matches)
+        return regions
+
+    def _preorder_position(self, region: Tree) -> list[int]:
+        """Returns the position of the given descendant of this tree as the index of each subtree on the path from
+        this tree down to it. Comparing positions orders descendants as a pre-order traversal would reach them.
+
+        Preconditions:
+            - region is a descendant of this tree
+        """
+        position = []
+        while region is not self:
+            position.append(region._parent._subtrees.index(region))
+            region = region._parent
+        position.reverse()
+        return position
 
     def navigate_sequence(self, items: list) -> Optional[Tree]:
         """Navigates and returns the tree that contains the last item in the given sequence of items
         Otherwise, return None if the sequence isn't in this tree.
 
         Note: The first item in "items" should be a child of this tree.
-        """
-        if len(items) == 0:
-            return self
-        elif items:
-            for subtree in self._subtrees:
-                if subtree._root == items[0]:
-                    return subtree.navigate_sequence(items[1:])
 
-        return None
+        >>> t = Tree('World', [])
+        >>> t.insert_sequence(['Asia', 'Japan', 'Tokyo'])
+        >>> t.insert_sequence(['Asia', 'Japan', 'Osaka'])
+        >>> len(t.navigate_sequence(['Asia', 'Japan']))
+        3
+        >>> t.navigate_sequence(['Asia', 'Korea']) is None
+        True
+        """
+        curr = self
+        for item in items:
+            if curr._children is None or item not in curr._children:
+                return None
+            curr = curr._children[item]
+        return curr
 
     def get_all_countries_sequence(self) -> list[tuple[Tree, list[str]]]:
         """Returns a list of tuples for each country. Each tuple contains a subtree representing
@@ -169,11 +370,7 @@ class Tree:
         Precondtions:
             - self._root == 'World'
         """
-        countries = []
-        for continent in self._subtrees:
-            for country in continent._subtrees:
-                countries.append((country, [continent._root, country._root]))
-        return countries
+        return list(self.iter_regions('country'))
 
     def get_all_cities_sequence(self) -> list[tuple[Tree, list[str]]]:
         """Returns a list of tuples for each city. Each tuple contains a subtree representing
@@ -184,86 +381,120 @@ class Tree:
         Precondtions:
             - self._root == 'World'
         """
-        cities = []
-        for continent in self._subtrees:
-            for country in continent._subtrees:
-                for city in country._subtrees:
-                    cities.append((city, [continent._root, country._root, city._root]))
-        return cities
+        return list(self.iter_regions('city'))
+
+    def iter_regions(self, kind: str) -> Iterator[tuple[Tree, list[str]]]:
+        """Lazily yields a tuple for each region of the given kind, in tree order. Each tuple contains a subtree
+        representing the region and a list of the sequence from a continent to the region.
+
+        Preconditions:
+            - kind in {'continent', 'country', 'city'}
+            - self._root == 'World'
+
+        >>> t = Tree('World', [])
+        >>> t.insert_sequence(['Asia', 'Japan', 'Tokyo'])
+        >>> t.insert_sequence(['Europe', 'France', 'Paris'])
+        >>> [sequence for _, sequence in t.iter_regions('country')]
+        [['Asia', 'Japan'], ['Europe', 'France']]
+        """
+        depth = ['continent', 'country', 'city'].index(kind) + 1
+        stack = [(subtree, [subtree._root]) for subtree in reversed(self._subtrees)]
+        while stack:
+            region, sequence = stack.pop()
+            if len(sequence) == depth:
+                yield region, sequence
+            else:
+                stack.extend((subtree, sequence + [subtree._root]) for subtree in reversed(region._subtrees))
 
     def get_songs(self) -> set[Song]:
         """Returns a set of all songs/leaves found in this tree
         """
-        if isinstance(self._root, Song):
-            return {self._root}
-        elif not self.is_empty():
-            songs = set()
-            for subtree in self._subtrees:
-                songs = songs.union(subtree.get_songs())
-            return songs
-        return set()
+        return set(self.iter_songs())
+
+    def iter_songs(self) -> Iterator[Song]:
+        """Lazily yields the song of every song leaf in this tree, in tree order.
+
+        A song charting in several cities is yielded once per city.
+        """
+        for subtree, _ in self._preorder():
+            if isinstance(subtree._root, Song):
+                yield subtree._root
+
+    def iter_ranked_songs(self) -> Iterator[tuple[Song, Optional[int]]]:
+        """Lazily yields a (song, rank) pair for every song leaf in this tree, in tree order, where rank is the
+        song's rank in the chart of the city it is found in.
+        """
+        for subtree, _ in self._preorder():
+            if isinstance(subtree._root, Song):
+                yield subtree._root, subtree._rank
+
+    def get_ranked_songs(self) -> list[tuple[Song, Optional[int]]]:
+        """Returns a (song, rank) pair for every song leaf found in this tree, where rank is the song's rank
+        in the chart of the city it is found in.
+
+        Unlike get_songs, a song charting in several cities appears once per city.
+        """
+        return list(self.iter_ranked_songs())
 
     def get_all_song_titles(self) -> set[str]:
         """Returns all of the song titles in the tree
         """
-        titles = set()
-        songs = self.get_songs()
-        for s in songs:
-            titles.add(s.title)
-        return titles
+        return {song.title for song in self.iter_songs()}
 
-    def top_n(self, n: int, target: str) -> list[tuple]:
+    def top_n(self, n: int, target: str | tuple[str, str]) -> list[tuple]:
         """
         This function takes in the tree itself, an int representing the number of top songs to return,
         and a target representing whether you want to find top songs from the world, continent, country, or city.
         Returns a list of tuple with the top n songs, their artists, and stream. Returns [] if the target is not found.
 
+        target may also be a (city, country) tuple to pick out one of several cities sharing a name.
+
+        Results are cached by (target, n) until the next insert into any tree.
+
         Representation Invariants:
             - n >= 1
-        """
-        if self._root == target:
-            return self._search_songs(n, {}, {}, {})
-        elif self._subtrees == []:
-            return []
-        else:
-            for subtree in self._subtrees:
-                top = subtree.top_n(n, target)
+
+        >>> t = Tree('World', [])
+        >>> t.insert_sequence(['Asia', 'Japan', 'Tokyo', Song('idol', 'yoasobi', 100)], 1)
+        >>> t.top_n(5, 'Japan')
+        [('idol', 'yoasobi', 100)]
+        >>> t.insert_sequence(['Asia', 'Japan', 'Osaka', Song('bling-bang-bang-born', 'creepy nuts', 90)], 1)
+        >>> t.top_n(5, 'Japan')
+        [('idol', 'yoasobi', 100), ('bling-bang-bang-born', 'creepy nuts', 90)]
+        """
+        top_n_cache = self._get_caches()['top_n']
+        if (target, n) not in top_n_cache:
+            top_n_cache[(target, n)] = []
+            for region in self.find_regions(target):
+                top = region._search_songs(n)
                 if top != []:
-                    return top
+                    top_n_cache[(target, n)] = top
+                    break
 
-            return []
+        return list(top_n_cache[(target, n)])
 
-    def _search_songs(self, n: int, songs: dict, s_and_artist: dict,
-                      s_and_stream: dict) -> list[tuple]:
+    def _get_caches(self) -> dict[str, Any]:
+        """Returns this tree's cached query results, creating them on first use, and discarding the ones that
+        depend on the tree's contents if any tree has been inserted into since they were computed.
+        """
+        if self._caches is None:
+            self._caches = {'version': Tree._version, 'top_n': {}, 'score_matrices': {}, 'country_overlaps': {}}
+        elif self._caches['version'] != Tree._version:
+            self._caches['version'] = Tree._version
+            self._caches['top_n'] = {}
+            self._caches['score_matrices'] = {}
+        return self._caches
+
+    def _search_songs(self, n: int) -> list[tuple]:
         """
         This is a helper function for top_n, it returns the name, artist,
         and streams of the top n songs in a list of tuples.
-        """
 
-        if isinstance(self._root, Song):
-            if self._root.title in songs:
-                songs[self._root.title] += 1
-            else:
-                songs[self._root.title] = 1
-
-            s_and_artist[self._root.title] = self._root.artist
-            s_and_stream[self._root.title] = self._root.streams
-            return []
-
-        else:
-            for subtree in self._subtrees:
-                subtree._search_songs(n, songs, s_and_artist, s_and_stream)
-
-            songs = dict(sorted(songs.items(), key=lambda x: x[1], reverse=True))
-            songs = list(songs)
-            lst = []
-            for i in range(n):
-                if i >= len(songs):
-                    return lst
-
-                lst += [(songs[i], s_and_artist[songs[i]], s_and_stream[songs[i]])]
-
-            return lst
+        Songs are ranked by the number of times they appear in this tree, with ties kept in the order the songs
+        were first added to it. The counts are read from this tree's running aggregate, so the tree is not
+        traversed, and only the top n songs are selected from them.
+        """
+        return self._aggregate.top_n(n)
 
     def common_artist(self, country1: str, country2: str) -> list[str]:
         """
@@ -338,32 +569,14 @@ class Tree:
         This function takes in a country name as an input and compares the artists of the top songs from
         this country to all other countries in the tree and outputs a list of the most common country
 
+        The overlaps between every pair of countries are computed once and kept up to date as the tree changes,
+        so each call is a single row lookup.
+
         Preconditions:
             - self._root == 'World'
         """
-        countries = set()
-        for continent in self._subtrees:
-            for country in continent._subtrees:
-                if country._root != country1:
-                    countries.add(country._root)
-
-        country_top_artist = self.common_song_artist_helper(country1, 'artist')
-        most_similar = {}
-
-        for country in countries:
-            temp_country_list = self.common_song_artist_helper(country, 'artist')
-            for artist in temp_country_list:
-                if artist in country_top_artist and country in most_similar:
-                    most_similar[country] += 1
-                elif artist in country_top_artist:
-                    most_similar[country] = 1
-
-        most_similar = dict(
-            sorted(most_similar.items(), key=lambda x: x[1], reverse=True))
-        most_similar = list(most_similar)
-        most_similar = most_similar[0]
-
-        return most_similar
+        overlaps = self._get_country_overlaps('artist')
+        return overlaps.most_common(country1, self.common_song_artist_helper(country1, 'artist'))
 
     def most_common_song_country(self, country1: str) -> str:
         """
@@ -371,33 +584,38 @@ class Tree:
         this country to the top songs in all other countries in the tree and outputs a list
         of the most common country
 
+        The overlaps between every pair of countries are computed once and kept up to date as the tree changes,
+        so each call is a single row lookup.
+
         Preconditions:
             - self._root == 'World'
         """
+        overlaps = self._get_country_overlaps('song')
+        return overlaps.most_common(country1, self.common_song_artist_helper(country1, 'song'))
 
-        countries = set()
-        for continent in self._subtrees:
-            for country in continent._subtrees:
-                if country._root != country1:
-                    countries.add(country._root)
+    def _get_country_overlaps(self, c_type: str) -> CountryOverlapMatrix:
+        """Returns the CountryOverlapMatrix of the top 5 artists/songs of the countries in this tree, building it on
+        first use and refreshing the countries whose top 5 changed since it was last used.
 
-        country_top_songs = self.common_song_artist_helper(country1, 'song')
-        most_similar = {}
-
-        for country in countries:
-            temp_country_list = self.common_song_artist_helper(country, 'song')
-            for song in temp_country_list:
-                if song in country_top_songs and country in most_similar:
-                    most_similar[country] += 1
-                elif song in country_top_songs:
-                    most_similar[country] = 1
+        Preconditions:
+            - c_type in {'artist', 'song'}
+            - self._root == 'World'
+        """
+        overlaps = self._get_caches()['country_overlaps']
+        if c_type in overlaps and overlaps[c_type].version == Tree._version:
+            return overlaps[c_type]
 
-        most_similar = dict(
-            sorted(most_similar.items(), key=lambda x: x[1], reverse=True))
-        most_similar = list(most_similar)
-        most_similar = most_similar[0]
+        tops = {}
+        for continent in self._subtrees:
+            for country in continent._subtrees:
+                tops.setdefault(country._root, self.common_song_artist_helper(country._root, c_type))
 
-        return most_similar
+        if c_type in overlaps and overlaps[c_type].countries == list(tops):
+            overlaps[c_type].update(tops)
+        else:
+            overlaps[c_type] = CountryOverlapMatrix(tops)
+        overlaps[c_type].version = Tree._version
+        return overlaps[c_type]
 
     def common_song_artist_helper(self, country: str, c_type: str) -> list[str]:
         """
@@ -449,10 +667,10 @@ class Tree:
             for i in range(len(songs)):
                 ranked_dict[songs[i]] = i + 1
 
-        region_songs = self.get_songs()
-        for song in region_songs:
+        region_songs = self.get_ranked_songs()
+        for song, rank in region_songs:
             if song.title in songs and ranked:
-                total_score += 1 - (abs(ranked_dict[song.title] - song.rank) / 5)
+                total_score += 1 - (abs(ranked_dict[song.title] - rank) / 5)
             elif song.title in songs:
                 total_score += 1
             num_songs += 1
@@ -475,28 +693,18 @@ class Tree:
             - self._root == "World"
             - 1 <= len(songs) <= 5
         """
-        scores = []
-
-        if region_range == 'continent':
-            for continent in self._subtrees:
-                com_score = continent.get_comparison_score(songs, ranked)
-                sequence = [continent._root]
-                scores.append((com_score, sequence))
-        elif region_range == 'country':
-            countries = self.get_all_countries_sequence()
-            for country in countries:
-                com_score = country[0].get_comparison_score(songs, ranked)
-                sequence = country[1]
-                scores.append((com_score, sequence))
-        else:
-            cities = self.get_all_cities_sequence()
-            for city in cities:
-                if city[0]._root != '0':
-                    com_score = city[0].get_comparison_score(songs, ranked)
-                    sequence = city[1]
-                    scores.append((com_score, sequence))
-
+        matrix = self._get_score_matrix(region_range)
+        matching = matrix.matching_scores(songs, ranked)
+        scores = [(matching[row], matrix.sequences[row]) for row in matching
+                  if region_range != 'city' or matrix.sequences[row][-1] != '0']
         scores.sort(reverse=True)
+
+        # regions sharing none of the songs all score 0, so they are only listed when there are fewer than n others
+        if len(scores) < n:
+            zeros = [(0.0, matrix.sequences[row]) for row in range(len(matrix.sequences)) if row not in matching
+                     and (region_range != 'city' or matrix.sequences[row][-1] != '0')]
+            scores.extend(heapq.nlargest(n - len(scores), zeros))
+
         return scores[:min(len(scores), n)]
 
     def recommend_songs(self, lim: tuple[int, int], songs: list[str],
@@ -529,37 +737,15 @@ class Tree:
         """
         Returns dictionary mapping parts of a region with the total number of streams from their top 5 songs.
 
+        The top songs are read from each region's running aggregate, so this takes time proportional to the number
+        of regions rather than re-searching the tree for each of them.
+
         Preconditions:
             - kind in {"continent", "country", "city"}
             - self.is_empty == False
         """
-
-        def get_stream_stat(tree: Tree, target: str) -> int:
-            """
-            Returns the total stream count from the top 5 songs OVERALL from a tree's subroots since stream numbers are
-            taken from a country's total streams for one song (not by specific cities/states)
-
-            Preconditions:
-                - tree.is_empty == False
-            """
-            return sum([song[2] for song in tree.top_n(5, target)])
-
-        # return roots of all subtrees listed in a given set
-        if kind == "continent":
-            continents = self.get_regions_as_subtrees("continent")
-            return {continent._root: get_stream_stat(self, continent._root) for continent in continents}
-        elif kind == "country":
-            countries = self.get_regions_as_subtrees("country")
-            return {curr_country._root: get_stream_stat(self, curr_country._root) for curr_country in countries}
-        else:
-            countries = self.get_regions_as_subtrees("country")
-
-            tups = []
-            for country in countries:
-                for city in country._subtrees:
-                    tups.append((city._root, country._root))
-
-            return {tup: get_stream_stat(self, tup[0]) for tup in tups}
+        return {key: sum(song[2] for song in region._aggregate.top_n(5))
+                for key, region in self._regions_by_key(kind).items()}
 
     def get_region_scores(self, songs: list[str], kind: str, ranked: bool = False) \
             -> dict[str, float] | dict[tuple, float]:
@@ -574,53 +760,95 @@ class Tree:
             - isinstance(self._root, str)
             - 1 <= len(songs) <= 5
         """
-        if kind == "continent":
-            continents = self.get_regions_as_subtrees("continent")
-            return {continent._root: continent.get_comparison_score(songs, ranked) for continent in continents}
-        elif kind == "country":
-            countries = self.get_regions_as_subtrees("country")
-            return {curr_country._root: curr_country.get_comparison_score(songs, ranked) for curr_country in countries}
+        matrix = self._get_score_matrix(kind)
+        if kind == 'city':
+            keys = [(sequence[2], sequence[1]) for sequence in matrix.sequences]
         else:
-            countries = self.get_regions_as_subtrees("country")
+            keys = [sequence[-1] for sequence in matrix.sequences]
+        return dict(zip(keys, matrix.scores(songs, ranked)))
 
-            tups = []
-            for country in countries:
-                for city in country._subtrees:
-                    tups.append((city, city._root, country._root))
+    def _get_score_matrix(self, kind: str) -> RegionSongMatrix:
+        """Returns the RegionSongMatrix of the regions of the given kind in this tree, building it if it is not
+        already cached.
 
-            return {(tup[1], tup[2]): tup[0].get_comparison_score(songs, ranked) for tup in tups}
+        Preconditions:
+            - kind in {"continent", "country", "city"}
+            - self._root == "World"
+        """
+        score_matrices = self._get_caches()['score_matrices']
+        if kind not in score_matrices:
+            score_matrices[kind] = RegionSongMatrix(list(self.iter_regions(kind)))
+        return score_matrices[kind]
 
     def get_region_top_songs(self, kind: str) -> dict[str, list[str]] | dict[tuple, list[str]]:
         """
         Returns dictionary mapping parts of a region with lists of their top 5 songs in descending order of
         number of streams.
 
+        Like get_region_streams, this reads each region's running aggregate.
+
         Preconditions:
                 - tree.is_empty == False
         """
+        return {key: [song[0] for song in region._aggregate.top_n(5)]
+                for key, region in self._regions_by_key(kind).items()}
 
-        def get_top_5(tree: Tree, target: str) -> list[str]:
-            """
-            Returns list of the NAMES of the top 5 songs in a specific region in descending order of number of
-            streams.
-            """
-            return [song[0] for song in tree.top_n(5, target)]
+    def get_region_summary(self, kind: str) -> dict[str, list]:
+        """Returns a table summarizing every region of the given kind, as columns ready for pd.DataFrame.
 
-        if kind == "continent":
-            continents = self.get_regions_as_subtrees("continent")
-            return {continent._root: get_top_5(self, continent._root) for continent in continents}
-        elif kind == "country":
-            countries = self.get_regions_as_subtrees("country")
-            return {curr_country._root: get_top_5(self, curr_country._root) for curr_country in countries}
-        else:
-            countries = self.get_regions_as_subtrees("country")
+        The table has a row for each key of get_region_streams, in tree order, and the columns:
+          - 'name': the name of the region
+          - 'country': the country of the region (the region itself for countries, None for continents)
+          - 'streams': the total number of streams from the region's top 5 songs
+          - 'Top 1 Song' to 'Top 5 Song': the titles of the region's top 5 songs
+
+        The regions are visited once, and the top songs of each are looked up once for both the streams and the
+        titles.
+
+        Preconditions:
+            - kind in {"continent", "country", "city"}
+            - self._root == "World"
+            - every region has at least 5 distinct songs
+
+        >>> t = Tree('World', [])
+        >>> for i in range(5):
+        ...     t.insert_sequence(['Asia', 'Japan', 'Tokyo', Song(f'song {i}', 'yoasobi', 10 * i)], i + 1)
+        >>> summary = t.get_region_summary('city')
+        >>> summary['name'], summary['country'], summary['streams'], summary['Top 5 Song']
+        (['Tokyo'], ['Japan'], [100], ['song 4'])
+        """
+        columns = {'name': [], 'country': [], 'streams': []}
+        tops = [[] for _ in range(5)]
+        for key, region in self._regions_by_key(kind).items():
+            top = region._aggregate.top_n(5)
+            if kind == 'city':
+                columns['name'].append(key[0])
+                columns['country'].append(key[1])
+            else:
+                columns['name'].append(key)
+                columns['country'].append(key if kind == 'country' else None)
+            columns['streams'].append(sum(song[2] for song in top))
+            for i in range(5):
+                tops[i].append(top[i][0])
 
-            tups = []
-            for country in countries:
-                for city in country._subtrees:
-                    tups.append((city._root, country._root))
+        for i in range(5):
+            columns[f'Top {i + 1} Song'] = tops[i]
+        return columns
 
-            return {tup: get_top_5(self, tup[0]) for tup in tups}
+    def _regions_by_key(self, kind: str) -> dict[str, Tree] | dict[tuple, Tree]:
+        """Returns a mapping from the key of each region of the given kind to its subtree, in tree order. Continents
+        and countries are keyed by name and cities by (city, country). If several regions share a key, the first
+        one is kept, as top_n would find it.
+
+        Preconditions:
+            - kind in {"continent", "country", "city"}
+            - self._root == "World"
+        """
+        regions = {}
+        for region, sequence in self.iter_regions(kind):
+            key = (sequence[2], sequence[1]) if kind == 'city' else sequence[-1]
+            regions.setdefault(key, region)
+        return regions
 
     def get_regions_as_subtrees(self, kind: str) -> set[Tree]:
         """
@@ -631,50 +859,38 @@ class Tree:
             - self.is_empty == False
             - self._root == "World"
         """
-        continents = set(self._subtrees)
-
-        if kind == "continent":
-            return continents
-        else:
-            countries = set()
-            for continent in continents:
-                for country in continent._subtrees:
-                    countries.add(country)
-        if kind == 'country':
-            return countries
-        else:
-            cities = set()
-            for country in countries:
-                for city in country._subtrees:
-                    cities.add(city)
-            return cities
+        return {region for region, _ in self.iter_regions(kind)}
 
 
+@dataclass(frozen=True, slots=True)
 class Song:
-    """A class storing metadata of a song.
+    """An immutable record storing metadata of a song.
+
+    Songs are compared and hashed by value, so one Song can be shared by every city it charts in. The rank of
+    a song in a particular city is stored on that city's song leaf instead (see Tree._rank).
+
     Instance Attributes:
       - title: the name of the song
       - artist: the name of the first artist
       - streams: the number of streams of the song
-      - rank: The rank of the song in the city/country
 
     Representation Invariants:
         - self.streams >= 0
-        - 1 <= self.rank <= 5 
+
+    >>> Song('idol', 'yoasobi', 100) == Song('idol', 'yoasobi', 100)
+    True
+    >>> len({Song('idol', 'yoasobi', 100), Song('idol', 'yoasobi', 100)})
+    1
     """
     title: str
     artist: str
     streams: Union[int, str]
-    rank: int
-
-    def __init__(self, title: str, artist: str, streams: Union[int, str], rank: int) -> None:
-        self.title = title
-        self.artist = artist
-        self.streams = streams
-        self.rank = rank
 
 
 if __name__ == "__main__":
+    import python_ta
+
     python_ta.check_all(config={
+        'extra-imports': ['heapq', 'region_aggregates'],
         'max-line-length': 120
     })
@@ -7,18 +7,27 @@ File Description
 This file contains functions necessary to visualize tree data.
 
 """
-import python_ta
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
 
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
 import numpy as np
-import requests
 import geopandas as gpd
 import country_converter as coco
 
 import storage
 
+ISO3_CACHE_FILE = 'iso3_cache.json'
+CONTINENTS_FILE = 'continents.geojson'
+CITIES_FILE = 'worldcities.csv'
+CITIES_CACHE_FILE = 'worldcities.npz'
+
 
 def all_options_table(available_set: set, kind: str) -> None:
     """
@@ -47,72 +56,197 @@ def all_options_table(available_set: set, kind: str) -> None:
     fig.show()
 
 
-def generate_region_df_by_streams(data: storage.Tree, kind: str) -> pd.DataFrame:
+class GeoData:
+    """The geographic data needed to draw the maps, read from disk when first needed and then kept by this object.
+
+    Instance Attributes:
+      - iso3_cache_file: the file caching the ISO3 code of every country name converted so far
+      - continents_file: the GeoJSON file of the outline of every continent
+      - cities_file: the csv file of the coordinates of the world's cities
+      - cities_cache_file: the binary columnar copy of cities_file
+    """
+    # Private Instance Attributes:
+    #   - _iso3_codes:
+    #       A mapping from each country name converted so far to its ISO3 code, or None if iso3_cache_file has not
+    #       been read yet.
+    #   - _continents:
+    #       The GeoDataFrame read from continents_file, or None if it has not been read yet.
+    #   - _city_index:
+    #       The columns read from cities_cache_file and the index of their rows by (city_ascii, iso3), or None if
+    #       they have not been read yet.
+    iso3_cache_file: str
+    continents_file: str
+    cities_file: str
+    cities_cache_file: str
+    _iso3_codes: Optional[dict[str, str]]
+    _continents: Optional[gpd.GeoDataFrame]
+    _city_index: Optional[tuple[dict[str, np.ndarray], dict[tuple[str, str], list[int]]]]
+
+    def __init__(self, iso3_cache_file: str = ISO3_CACHE_FILE, continents_file: str = CONTINENTS_FILE,
+                 cities_file: str = CITIES_FILE, cities_cache_file: str = CITIES_CACHE_FILE) -> None:
+        """Initialize the geographic data read from the given files, without reading them yet.
+        """
+        self.iso3_cache_file = iso3_cache_file
+        self.continents_file = continents_file
+        self.cities_file = cities_file
+        self.cities_cache_file = cities_cache_file
+        self._iso3_codes = None
+        self._continents = None
+        self._city_index = None
+
+    def iso3_codes(self, names: Iterable[str]) -> dict[str, str]:
+        """
+        Returns a dictionary mapping each of the given country names to its ISO3 code.
+
+        Codes are kept in a cache that is read from iso3_cache_file once and written back whenever it grows, so
+        each country name only ever goes through coco.convert once. Names missing from the cache are all converted
+        in one batched coco.convert call. Names coco cannot convert are mapped to 'not found', as coco.convert
+        itself returns.
+        """
+        names = list(names)
+        if self._iso3_codes is None:
+            self._iso3_codes = {}
+            try:
+                with open(self.iso3_cache_file, encoding='utf8') as file:
+                    self._iso3_codes = json.load(file)
+            except (OSError, ValueError):
+                pass
+
+        missing = sorted({name for name in names if name not in self._iso3_codes})
+        if missing:
+            codes = coco.convert(names=missing, to='ISO3')
+            self._iso3_codes.update(zip(missing, [codes] if isinstance(codes, str) else codes))
+            with open(self.iso3_cache_file + '.tmp', 'w', encoding='utf8') as file:
+                json.dump(self._iso3_codes, file, indent=0, sort_keys=True)
+            os.replace(self.iso3_cache_file + '.tmp', self.iso3_cache_file)
+
+        return {name: self._iso3_codes[name] for name in names}
+
+    def continent_geometry(self) -> gpd.GeoDataFrame:
+        """
+        Returns a GeoDataFrame of the outline of every continent, with a 'continent' column of merge keys: continent
+        names in lowercase without spaces, as in the tables passed to visualize_world_song_data.
+
+        continents_file ships with the program with its merge keys already normalized, so it is only read, once.
+        It was made from the Natural Earth 1:110m countries, dissolved by continent.
+        """
+        if self._continents is None:
+            self._continents = gpd.read_file(self.continents_file)
+        return self._continents
+
+    def city_index(self) -> tuple[dict[str, np.ndarray], dict[tuple[str, str], list[int]]]:
+        """
+        Returns the 'city', 'city_ascii', 'iso3', 'lat' and 'lng' columns of the world cities table, and an index
+        mapping each (city_ascii, iso3) pair to the rows holding it, in file order.
+
+        The columns are read once from cities_cache_file, a binary columnar copy of cities_file. The cache is
+        rebuilt from cities_file only when it is missing or older than cities_file.
+        """
+        if self._city_index is None:
+            cache_file, source_file = self.cities_cache_file, self.cities_file
+            if not os.path.exists(cache_file) or \
+                    (os.path.exists(source_file) and os.path.getmtime(source_file) > os.path.getmtime(cache_file)):
+                cities = pd.read_csv(source_file, usecols=['city', 'city_ascii', 'iso3', 'lat', 'lng'])
+                with open(cache_file + '.tmp', 'wb') as file:
+                    np.savez(file, **{name: cities[name].to_numpy(dtype=str if name not in {'lat', 'lng'} else float)
+                                      for name in cities.columns})
+                os.replace(cache_file + '.tmp', cache_file)
+
+            with np.load(cache_file) as cache:
+                columns = {name: cache[name] for name in cache.files}
+            index = {}
+            for row, key in enumerate(zip(columns['city_ascii'].tolist(), columns['iso3'].tolist())):
+                index.setdefault(key, []).append(row)
+            self._city_index = (columns, index)
+        return self._city_index
+
+
+def join_city_coordinates(table: pd.DataFrame, geo: GeoData) -> pd.DataFrame:
+    """
+    Returns the given table of cities with the 'city', 'lat' and 'lng' of every world city matching its city_ascii
+    and iso3 columns, like merging it into the whole world cities table, but looking up only the cities in the
+    table, in the index of geo. As on the map, only the first row of each city name is kept.
+
+    Preconditions:
+        - 'city_ascii' in table and 'iso3' in table
+    """
+    columns, index = geo.city_index()
+    rows = []
+    table_rows = []
+    for i, key in enumerate(zip(table['city_ascii'], table['iso3'])):
+        for row in index.get(key, []):
+            rows.append(row)
+            table_rows.append(i)
+
+    # keep the world cities table's order, as a merge into it would
+    order = np.argsort(rows, kind='stable')
+    rows = np.array(rows, dtype=int)[order]
+    cities = table.iloc[np.array(table_rows, dtype=int)[order]].reset_index(drop=True)
+    cities.insert(0, 'city', columns['city'][rows])
+    cities.insert(1, 'lat', columns['lat'][rows])
+    cities.insert(2, 'lng', columns['lng'][rows])
+    return cities.drop_duplicates(subset='city', keep='first')
+
+
+def generate_region_df_by_streams(data: storage.Tree, kind: str, geo: GeoData) -> pd.DataFrame:
     """
     Returns a processed dataframe listing the names of the members of the specified region, "Streams" for the total
     number of streams among the specified region's top 5 songs, and 5 columns listing the top songs for each member of
     the region.
 
     Since ISO3 codes are a preset for go.Choropleth and px.Choropleth, dataframes with a column listing counties will
-    also have a column listing their corresponding ISO3 codes.
+    also have a column listing their corresponding ISO3 codes, looked up in geo.
 
     Preconditions:
         - data.is_empty is False
         - kind in {"continent", "country", "city"}
     """
-    region_to_streams = data.get_region_streams(kind)
-    region_top_5 = data.get_region_top_songs(kind)
+    summary = data.get_region_summary(kind)
+    iso3 = geo.iso3_codes(summary['country']) if kind != 'continent' else {}
+    top_5 = {f'Top {i} Song': summary[f'Top {i} Song'] for i in range(1, 6)}
 
     if kind == "continent":
-        df_dict = {"continent": [name.lower() for name in region_to_streams],
-                   "streams": [region_to_streams[name] for name in region_to_streams],
-                   "Top 1 Song": [region_top_5[code][0] for code in region_top_5],
-                   "Top 2 Song": [region_top_5[code][1] for code in region_top_5],
-                   "Top 3 Song": [region_top_5[code][2] for code in region_top_5],
-                   "Top 4 Song": [region_top_5[code][3] for code in region_top_5],
-                   "Top 5 Song": [region_top_5[code][4] for code in region_top_5]
-                   }
+        df_dict = {"continent": [name.lower() for name in summary['name']],
+                   "streams": summary['streams'],
+                   **top_5}
         return pd.DataFrame(data=df_dict).sort_values("continent")
     elif kind == "country":
-        df_dict = {"country": list(region_to_streams),
-                   "iso3": [coco.convert(names=name, to='ISO3') for name in region_to_streams],
-                   "streams": [region_to_streams[code] for code in region_to_streams],
-                   "Top 1 Song": [region_top_5[code][0] for code in region_top_5],
-                   "Top 2 Song": [region_top_5[code][1] for code in region_top_5],
-                   "Top 3 Song": [region_top_5[code][2] for code in region_top_5],
-                   "Top 4 Song": [region_top_5[code][3] for code in region_top_5],
-                   "Top 5 Song": [region_top_5[code][4] for code in region_top_5]
-                   }
+        df_dict = {"country": summary['name'],
+                   "iso3": [iso3[name] for name in summary['country']],
+                   "streams": summary['streams'],
+                   **top_5}
 
         return pd.DataFrame(data=df_dict).sort_values("country")
     else:
-        df_dict = {"city_ascii": [name[0] for name in region_to_streams],
-                   "iso3": [coco.convert(names=name[1], to='ISO3') for name in region_to_streams],
-                   "streams": [region_to_streams[name] for name in region_to_streams],
-                   "Top 1 Song": [region_top_5[code][0] for code in region_top_5],
-                   "Top 2 Song": [region_top_5[code][1] for code in region_top_5],
-                   "Top 3 Song": [region_top_5[code][2] for code in region_top_5],
-                   "Top 4 Song": [region_top_5[code][3] for code in region_top_5],
-                   "Top 5 Song": [region_top_5[code][4] for code in region_top_5]
-                   }
+        df_dict = {"city_ascii": summary['name'],
+                   "iso3": [iso3[name] for name in summary['country']],
+                   "streams": summary['streams'],
+                   **top_5}
 
         return pd.DataFrame(data=df_dict).sort_values("city_ascii")
 
 
-def generate_region_df_by_score(data: storage.Tree, songs: list[str], kind: str, ranked: bool = False) -> pd.DataFrame:
+def generate_region_df_by_score(data: storage.Tree, songs: list[str], kind: str, geo: GeoData,
+                                ranked: bool = False) -> pd.DataFrame:
     """
     Returns a processed dataframe listing the names of the members of the specified region, "Streams" for the total
     number of streams among the specified region's top 5 songs, and 5 columns listing the top songs for each member of
     the region.
 
     Since ISO3 codes are a preset for go.Choropleth and px.Choropleth, dataframes with a column listing counties will
-    also have a column listing their corresponding ISO3 codes.
+    also have a column listing their corresponding ISO3 codes, looked up in geo.
 
     Preconditions:
         - data.is_empty is False
         - kind in {"continent", "country", "city"}
     """
     region_to_scores = data.get_region_scores(songs, kind, ranked)
+    if kind == "country":
+        iso3 = geo.iso3_codes(region_to_scores)
+    elif kind == "city":
+        iso3 = geo.iso3_codes(name[1] for name in region_to_scores)
+    else:
+        iso3 = {}
 
     if kind == "continent":
         df_dict = {"continent": [name.lower() for name in region_to_scores],
@@ -120,26 +254,49 @@ def generate_region_df_by_score(data: storage.Tree, songs: list[str], kind: str,
         return pd.DataFrame(data=df_dict).sort_values("continent")
     elif kind == "country":
         df_dict = {"country": list(region_to_scores),
-                   "iso3": [coco.convert(names=name, to='ISO3') for name in region_to_scores],
+                   "iso3": [iso3[name] for name in region_to_scores],
                    "scores": [region_to_scores[code] for code in region_to_scores]}
 
         return pd.DataFrame(data=df_dict).sort_values("country")
     else:
         df_dict = {"city_ascii": [name[0] for name in region_to_scores],
-                   "iso3": [coco.convert(names=name[1], to='ISO3') for name in region_to_scores],
+                   "iso3": [iso3[name[1]] for name in region_to_scores],
                    "scores": [region_to_scores[name] for name in region_to_scores]}
 
         return pd.DataFrame(data=df_dict).sort_values("city_ascii")
 
 
-def visualize_world_song_data(kind: str, stat: str, table: pd.DataFrame) -> None:
+def visualize_world_song_data(kind: str, stat: str, table: pd.DataFrame, geo: GeoData) -> None:
     """
-    Visualizes data using functions from Storage.py
+    Visualizes data using functions from Storage.py, with the geographic data in geo.
 
     Preconditions
         - kind in {'continent', 'country', 'city'}
         - stat in {'scores', 'streams'}
     """
+    build_world_song_figure(kind, stat, table, geo).show()
+
+
+def build_world_song_figure(kind: str, stat: str, table: pd.DataFrame, geo: GeoData) -> go.Figure:
+    """
+    Returns the map visualizing the given table, as shown by visualize_world_song_data.
+
+    Preconditions
+        - kind in {'continent', 'country', 'city'}
+        - stat in {'scores', 'streams'}
+    """
+    return draw_world_song_figure(kind, stat, prepare_map_table(kind, table, geo))
+
+
+def prepare_map_table(kind: str, table: pd.DataFrame, geo: GeoData) -> pd.DataFrame:
+    """
+    Returns the given table joined with the geographic data in geo that its map is drawn with: the outline of every
+    continent, or the coordinates of every city. Countries are located by their ISO3 codes, so a table of countries
+    is returned as it is.
+
+    Preconditions
+        - kind in {'continent', 'country', 'city'}
+    """
     if kind == 'continent':
         # DATA FRAMES FOR COUNTRIES:
         # where "table" = generate_region_df_by_streams(data, "continent")
@@ -151,17 +308,31 @@ def visualize_world_song_data(kind: str, stat: str, table: pd.DataFrame) -> None
         # alter continent names to merge with dataframe from json file
         ct_df['continent'] = ct_df['continent'].apply(lambda x: x.replace(" ", ""))
 
-        # LOAD GEO DATA: latitude and longitude mapped for cities in the world
-        cont = requests.get(
-            "https://gist.githubusercontent.com/cmunns/76fb72646a68202e6bde/raw/"
-            "8f954b3ca01835bee4af9ae50dfe73eb6ab88fca/continents.json"
-        )
-        gdf = gpd.GeoDataFrame.from_features(cont.json())
-        # alter continent names to merge later
-        gdf['continent'] = gdf['continent'].apply(lambda x: x.lower())
+        # LOAD GEO DATA: continent outlines, with names already altered to merge with the dataframe above
+        gdf = geo.continent_geometry()
 
         # merge dataframes
-        gdf = gdf.merge(ct_df).sort_values('continent')
+        return gdf.merge(ct_df).sort_values('continent')
+    elif kind == 'city':
+        # LOAD GEO DATA: latitude and longitude mapped for cities in the world
+        # downloaded locally as original from "simplemaps" was altered to update old city names
+        # only the cities in the data frame are looked up, dropping rows with cities not in it
+        return join_city_coordinates(table, geo)
+    else:
+        return table
+
+
+def draw_world_song_figure(kind: str, stat: str, table: pd.DataFrame) -> go.Figure:
+    """
+    Returns the map visualizing the given table, already joined with its geographic data by prepare_map_table.
+
+    Preconditions
+        - kind in {'continent', 'country', 'city'}
+        - stat in {'scores', 'streams'}
+    """
+    if kind == 'continent':
+        # where "table" = prepare_map_table("continent", generate_region_df_by_streams(data, "continent"), geo)
+        gdf = table
 
         # generate plot
         if stat == 'streams':
@@ -192,15 +363,13 @@ def visualize_world_song_data(kind: str, stat: str, table: pd.DataFrame) -> None
                                 color_continuous_scale="Reds",
                                 hover_data="scores"
                                 )
-            fig.update_traces(customdata=np.stack((ct_df['continent_title'],
-                                                   ct_df['scores']), axis=-1),
+            fig.update_traces(customdata=np.stack((gdf['continent_title'],
+                                                   gdf['scores']), axis=-1),
                               hovertemplate="<b>Continent: %{customdata[0]} </b><br>"
                                             "Similarity Score: %{customdata[1]}</b>")
             fig.update_layout(title="Similarity Scores by Continent Based on Top 5 Streamed Songs"
                                     " During the First Week of 2024")
 
-        fig.show()
-
     elif kind == 'country':
         # DATA FRAMES FOR COUNTRIES: ISO3 code preset for go.Choropleth
         # where "table" = generate_region_df_by_streams(data, "country")
@@ -240,19 +409,10 @@ def visualize_world_song_data(kind: str, stat: str, table: pd.DataFrame) -> None
             fig.update_layout(title="Similarity Scores by Country Based on Top 5 Streamed Songs"
                                     " During the First Week of 2024")
 
-        fig.show()
-
     else:
         # DATA FRAMES FOR CITIES
-        # where "table" = generate_region_df_by_streams(data, "city")
-        ci_df = table
-
-        # LOAD GEO DATA: latitude and longitude mapped for cities in the world
-        # downloaded locally as original from "simplemaps" was altered to update old city names
-        cities = pd.read_csv('worldcities.csv')
-
-        # merge data frames to drop rows with cities not in the data frames above
-        cities = cities.merge(ci_df).drop_duplicates(subset='city', keep='first')
+        # where "table" = prepare_map_table("city", generate_region_df_by_streams(data, "city"), geo)
+        cities = table
 
         # generate plot
         if stat == 'streams':
@@ -283,12 +443,189 @@ def visualize_world_song_data(kind: str, stat: str, table: pd.DataFrame) -> None
             fig.update_layout(title="Similarity Scores by City Based on Top 5 Streamed Songs"
                                     " During the First Week of 2024")
 
-        fig.show()
+    return fig
+
+
+class FigureCache:
+    """A bounded cache of the maps of recent queries, so that drawing the same map again is instant.
+
+    Figures are keyed by the tree they were drawn from, its version, and the query parameters. When more than
+    max_size figures are cached, the least recently used one is evicted.
+
+    Instance Attributes:
+      - max_size: the maximum number of figures kept
+      - geo: the geographic data the figures are drawn with
+
+    Representation Invariants:
+        - self.max_size >= 1
+        - len(self._figures) <= self.max_size
+    """
+    # Private Instance Attributes:
+    #   - _figures:
+    #       A mapping from (tree, tree version, kind, stat, songs, ranked) to the figure of that query, from least
+    #       to most recently used. The tree itself is part of the key, so it cannot be garbage collected and
+    #       have its id reused while its figures are cached.
+    max_size: int
+    geo: GeoData
+    _figures: OrderedDict[tuple, go.Figure]
+
+    def __init__(self, max_size: int, geo: GeoData) -> None:
+        """Initialize an empty cache holding at most max_size figures drawn with the given geographic data.
+        """
+        self.max_size = max_size
+        self.geo = geo
+        self._figures = OrderedDict()
+
+    def get_figure(self, data: storage.Tree, kind: str, stat: str, songs: Optional[list[str]] = None,
+                   ranked: bool = False) -> go.Figure:
+        """
+        Returns the map of the given tree's regions of the given kind by the given stat, building it with
+        generate_region_df_by_streams or generate_region_df_by_score and build_world_song_figure if it is not
+        cached. songs and ranked are only used for the 'scores' stat.
+
+        Preconditions
+            - kind in {'continent', 'country', 'city'}
+            - stat in {'scores', 'streams'}
+            - stat == 'streams' or songs is not None
+        """
+        if stat == 'streams':
+            songs, ranked = None, False
+        key = (data, data.get_version(), kind, stat, None if songs is None else tuple(songs), ranked)
+
+        if key in self._figures:
+            self._figures.move_to_end(key)
+        else:
+            if stat == 'streams':
+                table = generate_region_df_by_streams(data, kind, self.geo)
+            else:
+                table = generate_region_df_by_score(data, songs, kind, self.geo, ranked)
+            self._figures[key] = build_world_song_figure(kind, stat, table, self.geo)
+            if len(self._figures) > self.max_size:
+                self._figures.popitem(last=False)
+        return self._figures[key]
+
+
+def export_all_maps(data: storage.Tree, out_dir: str, file_format: str = 'html',
+                    song_queries: Optional[list[tuple[list[str], bool]]] = None,
+                    max_workers: Optional[int] = None) -> list[str]:
+    """
+    Exports the map of every kind of region by streams, and by the scores of every (songs, ranked) query in
+    song_queries, to static files in out_dir, and returns the paths of the files that were written.
+
+    Maps are named "<kind>_streams" and "<kind>_scores_<i>" for the i-th song query (starting at 1), with the
+    extension file_format: 'html' for standalone pages, or 'json' for Plotly JSON. The tables are generated and
+    joined with their geographic data here, and the figures are drawn in parallel in up to max_workers processes
+    (by default, one per CPU).
+
+    The SHA-256 hash of the table of every exported map is recorded in out_dir/manifest.json, and a map whose
+    table has the same hash as when its existing file was written is not rendered again.
+
+    Preconditions:
+        - file_format in {'html', 'json'}
+        - all(1 <= len(query[0]) <= 5 for query in song_queries)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_file = os.path.join(out_dir, 'manifest.json')
+    try:
+        with open(manifest_file, encoding='utf8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        manifest = {}
+
+    jobs = plan_export_jobs(data, out_dir, file_format, song_queries or [], manifest)
+    written = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for job, content in zip(jobs, executor.map(render_map, jobs)):
+            written.append(os.path.join(out_dir, f'{job[0]}.{file_format}'))
+            with open(written[-1], 'w', encoding='utf8') as file:
+                file.write(content)
+
+    with open(manifest_file, 'w', encoding='utf8') as file:
+        json.dump(manifest, file, indent=0, sort_keys=True)
+    return written
+
+
+def plan_export_jobs(data: storage.Tree, out_dir: str, file_format: str, song_queries: list[tuple[list[str], bool]],
+                     manifest: dict[str, str]) -> list[tuple[str, str, str, pd.DataFrame, str]]:
+    """
+    Returns the (name, kind, stat, table, file_format) render_map job of every map exported by export_all_maps
+    whose table changed since its file in out_dir was written, according to the given manifest, and records the
+    hashes of their new tables in the manifest.
+
+    A helper for export_all_maps. The tables of the returned jobs are already joined with their geographic data,
+    so the worker processes only draw them.
+    """
+    geo = GeoData()
+    jobs = []
+    for name, kind, stat, table in generate_export_tables(data, geo, song_queries):
+        file_name = f'{name}.{file_format}'
+        digest = hash_export_table(kind, stat, table, file_format)
+        if manifest.get(file_name) != digest or not os.path.exists(os.path.join(out_dir, file_name)):
+            manifest[file_name] = digest
+            jobs.append((name, kind, stat, prepare_map_table(kind, table, geo), file_format))
+    return jobs
+
+
+def generate_export_tables(data: storage.Tree, geo: GeoData,
+                           song_queries: list[tuple[list[str], bool]]) -> list[tuple[str, str, str, pd.DataFrame]]:
+    """
+    Returns the (name, kind, stat, table) of every map exported by export_all_maps, in the order they are named.
+
+    A helper for plan_export_jobs.
+    """
+    tables = []
+    for kind in ('continent', 'country', 'city'):
+        tables.append((f'{kind}_streams', kind, 'streams', generate_region_df_by_streams(data, kind, geo)))
+        for i, (songs, ranked) in enumerate(song_queries):
+            tables.append((f'{kind}_scores_{i + 1}', kind, 'scores',
+                           generate_region_df_by_score(data, songs, kind, geo, ranked)))
+    return tables
+
+
+def hash_export_table(kind: str, stat: str, table: pd.DataFrame, file_format: str) -> str:
+    """
+    Returns the SHA-256 hex digest of the given table of a map of the given kind, stat and file format.
+
+    A helper for plan_export_jobs. The digest covers the table's column names and values, so it changes whenever
+    the map drawn from the table would.
+
+    >>> table = pd.DataFrame({'country': ['Japan', 'France'], 'streams': [100, 80]})
+    >>> digest = hash_export_table('country', 'streams', table, 'html')
+    >>> digest == hash_export_table('country', 'streams', table.copy(), 'html')
+    True
+    >>> digest == hash_export_table('country', 'streams', table, 'json')
+    False
+    >>> table.loc[1, 'streams'] = 90
+    >>> digest == hash_export_table('country', 'streams', table, 'html')
+    False
+    """
+    digest = hashlib.sha256(json.dumps([kind, stat, file_format, list(table.columns)]).encode('utf8'))
+    digest.update(pd.util.hash_pandas_object(table, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def render_map(job: tuple[str, str, str, pd.DataFrame, str]) -> str:
+    """
+    Returns the map of the given (name, kind, stat, table, file_format) export job as the contents of its file,
+    where table is already joined with its geographic data by prepare_map_table.
+
+    A helper for export_all_maps. The figure is given a fixed id, so rendering the same table twice gives the
+    same file.
+    """
+    name, kind, stat, table, file_format = job
+    fig = draw_world_song_figure(kind, stat, table)
+    if file_format == 'html':
+        return fig.to_html(include_plotlyjs='cdn', div_id=name)
+    else:
+        return fig.to_json()
 
 
 if __name__ == "__main__":
+    import python_ta
+
     python_ta.check_all(config={
-        'extra-imports': ['plotly.express', 'plotly.graph_objects', 'pandas', 'geopandas',
-                          'numpy', 'requests', 'country_converter', 'storage'],
+        'extra-imports': ['collections', 'concurrent.futures', 'hashlib', 'json', 'os', 'plotly.express',
+                          'plotly.graph_objects', 'pandas', 'geopandas', 'numpy', 'country_converter', 'storage'],
+        'forbidden-io-functions': [],  # allows for open, to read and write the cache and manifest files
         'max-line-length': 120
     })